@@ -0,0 +1,291 @@
+"""
+API benchmark: drives every route of blogging/urls.py through Django's test
+client, in process, against a seeded dataset of configurable scale, and
+reports requests/sec, p50/p95/p99 latency and SQL queries per request.
+
+Each case runs its requests one after the other, so requests/sec is the
+single-client throughput of the whole stack (middleware, views, serializers,
+database) without any HTTP server. Use benchmarks.wsgi_vs_asgi for server
+concurrency. Request inputs (fresh refresh tokens, posts to delete, ...)
+are prepared outside the timed section. The admin site is not covered.
+
+Save the results and diff them against an earlier run:
+
+    python -m benchmarks.api --posts 20000 --output before.json
+    python -m benchmarks.api --posts 20000 --output after.json --baseline before.json
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from benchmarks.common import BASE_DIR, benchmark_database, setup_django, summarize
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Naresh', 'Priya', 'Wei', 'Fatima']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Sutha', 'Patel', 'Nguyen', 'Kim', 'Ivanova', 'Tanaka']
+WORDS = ['django', 'postgres', 'cache', 'latency', 'replica', 'index', 'python', 'queue', 'tuning', 'async']
+PASSWORD = 'benchmark-password'
+
+
+@dataclass
+class Case:
+    name: str
+    method: str
+    # i -> (path, body), called outside the timed section
+    prepare: object
+    expected: int = 200
+    content_type: str = 'application/json'
+    repeat: int = None
+    headers: dict = field(default_factory=dict)
+
+
+def backdate(model, objects, times, fields):
+    # bulk_create lets auto_now_add/auto_now overwrite the timestamps: write the intended ones afterwards
+    for obj, when in zip(objects, times):
+        for name in fields:
+            setattr(obj, name, when)
+    model.objects.bulk_update(objects, fields)
+
+
+def seed(users, posts, comments, batch_size):
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from django.utils import timezone
+    from post.models import Comment, Post
+    from user.models import User
+
+    rng = random.Random(42)
+    password = make_password(PASSWORD)
+    now = timezone.now()
+    user_ids = []
+    for start in range(0, users, batch_size):
+        created = User.objects.bulk_create([
+            User(email=f'user{i}@example.com', first_name=rng.choice(FIRST_NAMES),
+                 last_name=rng.choice(LAST_NAMES), password=password, is_staff=i == 0)
+            for i in range(start, min(start + batch_size, users))
+        ])
+        user_ids.extend(user.id for user in created)
+    call_command('rebuild_author_index', batch_size=batch_size, stdout=io.StringIO())
+
+    post_ids, counts = [], {}
+    for start in range(0, posts, batch_size):
+        numbers = range(start, min(start + batch_size, posts))
+        created = Post.objects.bulk_create([
+            Post(title=f'Benchmark post {i} about {rng.choice(WORDS)}',
+                 body=' '.join(rng.choice(WORDS) for _ in range(60)),
+                 author_id=user_ids[0] if i == 0 else rng.choice(user_ids),
+                 slug=f'benchmark-post-{i}')
+            for i in numbers
+        ])
+        backdate(Post, created, [now - timedelta(minutes=i) for i in numbers], ['timestamp', 'updated_at'])
+        post_ids.extend(post.id for post in created)
+
+    # Most comments go to a few posts, like real traffic
+    weights = [1 / (rank + 1) for rank in range(len(post_ids))]
+    for start in range(0, comments, batch_size):
+        batch, times = [], []
+        for i, post_id in enumerate(rng.choices(post_ids, weights, k=min(batch_size, comments - start))):
+            counts[post_id] = counts.get(post_id, 0) + 1
+            batch.append(Comment(body=f'Benchmark comment {start + i}', author_id=rng.choice(user_ids),
+                                 post_id=post_id))
+            times.append(now - timedelta(minutes=rng.randrange(60 * 24 * 30)))
+        backdate(Comment, Comment.objects.bulk_create(batch), times, ['timestamp'])
+    for post_id, count in counts.items():
+        Post.objects.filter(id=post_id).update(comment_count=count)
+    # The benchmark runs as the (staff) author of the newest post
+    return Post.objects.select_related('author').get(id=post_ids[0])
+
+
+def build_cases(user, post, repeat):
+    from django.core.cache import cache
+    from post.models import Post
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from user.serializers import RefreshTokenSerializer
+
+    refresh = str(RefreshTokenSerializer.token_class.for_user(user))
+    auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken(refresh).access_token}'}
+    hashing_repeat = max(1, repeat // 10)
+
+    def fixed(path, body=None):
+        return lambda i: (path, body)
+
+    def new_post(i):
+        created = Post.objects.create(title=f'Post to delete {i}', body='Deleted by the benchmark.', author=user)
+        return f'/posts/{created.slug}/', None
+
+    def uncached_detail(i):
+        cache.clear()
+        return f'/posts/{post.slug}/', None
+
+    def bulk(i):
+        lines = [json.dumps({'title': f'Imported post {i}-{n}', 'body': 'Imported by the benchmark run.',
+                             'comments': [{'body': 'Imported comment'}]}) for n in range(10)]
+        return '/posts/bulk/', '\n'.join(lines)
+
+    return auth, [
+        Case('register', 'POST', lambda i: ('/register/', {
+            'email': f'registered{i}-{time.time_ns()}@example.com', 'first_name': 'Bench', 'last_name': 'Mark',
+            'dob': '1990-01-01', 'password': PASSWORD}), expected=201, repeat=hashing_repeat),
+        Case('login', 'POST', fixed('/login/', {'email': user.email, 'password': PASSWORD}), repeat=hashing_repeat),
+        Case('refresh', 'POST', fixed('/refresh-token/', {'refresh': refresh})),
+        Case('logout', 'POST', lambda i: ('/logout/', {
+            'refresh': str(RefreshTokenSerializer.token_class.for_user(user))})),
+        Case('post list', 'GET', fixed('/posts/')),
+        Case('post list page 50', 'GET', fixed('/posts/?page=50')),
+        Case('post list cursor', 'GET', fixed('/posts/?pagination=cursor')),
+        Case('post list author', 'GET', fixed('/posts/?author=sutha')),
+        Case('post list previews', 'GET', fixed('/posts/?include=comment_preview')),
+        Case('post create', 'POST', lambda i: ('/posts/', {
+            'title': f'Benchmark created {i}', 'body': 'Created during the benchmark run.'}), expected=201),
+        Case('post search', 'GET', fixed('/posts/search/?q=postgres+latency')),
+        Case('post bulk import', 'POST', bulk, content_type='application/x-ndjson', repeat=max(1, repeat // 5)),
+        Case('post detail', 'GET', fixed(f'/posts/{post.slug}/')),
+        Case('post detail uncached', 'GET', uncached_detail),
+        Case('post update', 'PUT', fixed(f'/posts/{post.slug}/', {
+            'title': post.title, 'body': 'Updated during the benchmark run.'})),
+        Case('post delete', 'DELETE', new_post),
+        Case('comment list', 'GET', fixed(f'/posts/{post.slug}/comments/')),
+        Case('comment list page 50', 'GET', fixed(f'/posts/{post.slug}/comments/?page=50')),
+        Case('comment list cursor', 'GET', fixed(f'/posts/{post.slug}/comments/?pagination=cursor')),
+        Case('comment create', 'POST', fixed(f'/posts/{post.slug}/comments/', {'body': 'Benchmark comment'}),
+             expected=201),
+        Case('top five', 'GET', fixed('/top-five-posts/')),
+        Case('top five day', 'GET', fixed('/top-five-posts/?window=day&limit=10')),
+        Case('async post list', 'GET', fixed('/async/posts/')),
+        Case('async post detail', 'GET', fixed(f'/async/posts/{post.slug}/')),
+        Case('async comment list', 'GET', fixed(f'/async/posts/{post.slug}/comments/')),
+        Case('async comment create', 'POST', fixed(f'/async/posts/{post.slug}/comments/', {'body': 'Async comment'}),
+             expected=201),
+        Case('async top five', 'GET', fixed('/async/top-five-posts/')),
+        Case('export posts', 'GET', fixed('/export/posts/?max_id=%d' % (post.id + 999))),
+        Case('export comments', 'GET', fixed('/export/comments/?max_id=1000')),
+        Case('diagnostics', 'GET', fixed('/diagnostics/')),
+        Case('metrics', 'GET', fixed('/metrics')),
+        Case('swagger schema', 'GET', fixed('/swagger.json')),
+        Case('swagger', 'GET', fixed('/swagger/')),
+        Case('redoc', 'GET', fixed('/redoc/')),
+    ]
+
+
+def run_case(client, case, auth, repeat, warmup):
+    from django.db import connection
+
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries[-1] += 1
+        return execute(sql, params, many, context)
+
+    samples, errors = [], 0
+    repeat = case.repeat or repeat
+    for i in range(-min(warmup, repeat), repeat):
+        path, body = case.prepare(i)
+        if body is not None and case.content_type == 'application/json':
+            body = json.dumps(body)
+        queries.append(0)
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            response = client.generic(case.method, path, body or '', content_type=case.content_type,
+                                      **auth, **case.headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if i < 0:
+            queries.pop()
+            continue
+        samples.append(elapsed * 1000)
+        errors += response.status_code != case.expected
+
+    result = summarize(samples)
+    result.update(
+        requests_per_second=round(len(samples) / (sum(samples) / 1000), 1),
+        queries_per_request=round(sum(queries) / len(queries), 2),
+        errors=errors,
+    )
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline):
+    previous = {result['name']: result for result in baseline['results']} if baseline else {}
+    header = f"{'case':<24}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}"
+    print(header + (f"{'req/s vs baseline':>20}" if baseline else ''))
+    for result in results:
+        line = (f"{result['name']:<24}{result['requests_per_second']:>10,.1f}{result['p50_ms']:>9.2f}"
+                f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['queries_per_request']:>9.2f}"
+                f"{result['errors']:>8}")
+        before = previous.get(result['name'])
+        if before:
+            change = (result['requests_per_second'] / before['requests_per_second'] - 1) * 100
+            line += f"{change:>+19.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200, help="Timed requests per case")
+    parser.add_argument('--warmup', type=int, default=10, help="Untimed requests per case first")
+    parser.add_argument('--case', action='append', help="Only run the cases with these names")
+    parser.add_argument('--output', help="Save the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.test import Client
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    with benchmark_database() as connection:
+        started = time.monotonic()
+        post = seed(args.users, args.posts, args.comments, args.batch_size)
+        print(f"Seeded {args.users} users, {args.posts} posts and {args.comments} comments "
+              f"in {time.monotonic() - started:.1f}s")
+        client = Client()
+        auth, cases = build_cases(post.author, post, args.repeat)
+        results = []
+        for case in cases:
+            if args.case and case.name not in args.case:
+                continue
+            results.append({'name': case.name, 'method': case.method,
+                            **run_case(client, case, auth, args.repeat, args.warmup)})
+        vendor = connection.vendor
+
+    print_results(results, baseline)
+    if args.output:
+        report = {
+            'revision': git_revision(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': vendor,
+            'scale': {'users': args.users, 'posts': args.posts, 'comments': args.comments},
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
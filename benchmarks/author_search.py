@@ -0,0 +1,101 @@
+"""
+Author filter benchmark: seeds users (1M by default) and posts, then compares
+the trigram-indexed `author` filter of the post list with the old
+`icontains` join and checks that the query plan goes through the index.
+
+    python -m benchmarks.author_search --users 1000000 --posts 200000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import benchmark_database, measure, setup_django
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'Naresh', 'Priya', 'Wei', 'Fatima', 'Olga', 'Kenji']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Sutha', 'Patel', 'Nguyen', 'Kim', 'Ivanova', 'Tanaka', 'Rossi', 'Okafor']
+TERMS = ['naresh', 'sutha', 'ivanova', 'user123456', 'example', 'xyzzy', 'an']
+
+
+def uses_trigram_index(plan):
+    # PostgreSQL reports the constraint name, SQLite its own autoindex name
+    lines = [line.lower() for line in plan.splitlines() if 'usersearchtrigram' in line.lower()]
+    return bool(lines) and all('index' in line for line in lines)
+
+
+def seed(users, posts, batch_size):
+    from django.contrib.auth.hashers import make_password
+    from django.utils.text import slugify
+    from post.models import Post
+    from user.models import User, UserSearchTrigram
+    from user.search import user_trigrams
+
+    rng = random.Random(42)
+    password = make_password('benchmark-password')
+    author_ids = []
+    for start in range(0, users, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, users)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            batch.append(User(email=f'{first}.{last}.user{i}@example.com'.lower(),
+                              first_name=first, last_name=last, password=password))
+        created = User.objects.bulk_create(batch)
+        UserSearchTrigram.objects.bulk_create(
+            [UserSearchTrigram(user_id=user.id, trigram=gram) for user in created for gram in user_trigrams(user)],
+            batch_size=10000,
+        )
+        author_ids.extend(user.id for user in created)
+
+    for start in range(0, posts, batch_size):
+        Post.objects.bulk_create([
+            Post(title=f'Benchmark post {i}', body='Benchmark body text.', author_id=rng.choice(author_ids),
+                 slug=slugify(f'benchmark-post-{i}'))
+            for i in range(start, min(start + batch_size, posts))
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--posts', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keepdb', action='store_true', help="Reuse an already seeded test database")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Q
+    from post.models import Post
+    from user.models import User
+
+    with benchmark_database(keepdb=args.keepdb):
+        if not User.objects.exists():
+            started = time.monotonic()
+            seed(args.users, args.posts, args.batch_size)
+            print(f"Seeded {args.users} users and {args.posts} posts in {time.monotonic() - started:.1f}s")
+
+        for term in TERMS:
+            indexed = Post.objects.filter(
+                author__in=User.objects.search(term).values('id')).order_by('-timestamp', '-id')
+            legacy = Post.objects.filter(
+                Q(author__first_name__icontains=term) |
+                Q(author__last_name__icontains=term) |
+                Q(author__email__icontains=term)
+            ).order_by('-timestamp', '-id')
+
+            plan = indexed.explain()
+            indexed_stats = measure(lambda: list(indexed[:10]), args.repeat)
+            legacy_stats = measure(lambda: list(legacy[:10]), args.repeat)
+            print(f"\nauthor={term!r}: {indexed.count()} posts")
+            print(f"  trigram index : p50 {indexed_stats['p50_ms']:.2f} ms, p99 {indexed_stats['p99_ms']:.2f} ms")
+            print(f"  icontains join: p50 {legacy_stats['p50_ms']:.2f} ms, p99 {legacy_stats['p99_ms']:.2f} ms")
+            if len(term) < 3:
+                print("  index-backed  : n/a, terms under 3 characters fall back to icontains")
+            else:
+                print(f"  index-backed  : {'yes' if uses_trigram_index(plan) else 'NO'}")
+            print('  plan: ' + plan.replace('\n', '\n        '))
+
+
+if __name__ == '__main__':
+    main()
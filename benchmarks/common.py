@@ -0,0 +1,71 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throw-away test database created from the project
+settings (``test_<NAME>`` on PostgreSQL, in-memory on SQLite), so they never
+touch real data. Run them from the project root, e.g.::
+
+    python -m benchmarks.author_search --users 1000000
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogging.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Create the test database for the duration of the block. With `keepdb` an
+    existing test database (and its seeded data) is reused between runs.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def measure(fn, repeat):
+    """
+    Call `fn` `repeat` times and return latency statistics in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(percentile(50), 3),
+        'p95_ms': round(percentile(95), 3),
+        'p99_ms': round(percentile(99), 3),
+    }
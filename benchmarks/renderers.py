@@ -0,0 +1,108 @@
+"""
+Renderer benchmark: DRF's JSONRenderer/JSONParser vs the orjson pair of
+blogging/renderers.py on the payloads of the post and comment endpoints,
+plus what gzip (blogging/middleware.py) saves on each and what it costs.
+
+    python -m benchmarks.renderers --repeat 500
+"""
+import argparse
+import json
+
+from benchmarks.common import benchmark_database, measure, setup_django
+
+
+def seed(rows):
+    from django.contrib.auth.hashers import make_password
+    from post.models import Comment, Post
+    from user.models import User
+
+    password = make_password('benchmark-password')
+    users = User.objects.bulk_create([
+        User(email=f'writer{i}@example.com', first_name='Writer', last_name=str(i), password=password)
+        for i in range(50)
+    ])
+    posts = Post.objects.bulk_create([
+        Post(title=f'Benchmark post {i} — naïve café notes', body='Benchmark body text with some ünïcode. ' * 30,
+             author=users[i % 50], slug=f'benchmark-post-{i}', comment_count=i % 7)
+        for i in range(rows)
+    ])
+    Comment.objects.bulk_create([
+        Comment(body=f'Benchmark comment {i}, thanks for writing this!', author=users[i % 50], post=posts[0])
+        for i in range(rows)
+    ])
+    return posts[0]
+
+
+def envelope(data, msg="Retrieved successfully"):
+    return {'status': 200, 'msg': msg, 'data': data}
+
+
+def page(results):
+    # Shape of the PageNumberPagination responses
+    return {'count': 100000, 'next': 'http://testserver/posts/?page=3', 'previous': 'http://testserver/posts/',
+            'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    import io
+
+    from django.utils.text import compress_string
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from blogging.renderers import ORJSONParser, ORJSONRenderer, orjson
+    from post.models import Comment, Post
+    from post.serializers import (PostSerializer, comment_fast_serializer, post_fast_serializer,
+                                  top_comment_post_fast_serializer)
+
+    if orjson is None:
+        print("orjson is not installed: ORJSONRenderer falls back to DRF, expect no difference")
+
+    with benchmark_database():
+        post = seed(1000)
+        posts = Post.objects.order_by('-timestamp', '-id')
+        comments = Comment.objects.order_by('-timestamp')
+        payloads = [
+            ('post detail', envelope(PostSerializer(post).data, "Post fetched successfully")),
+            ('post list 10', page(post_fast_serializer.serialize(post_fast_serializer.values(posts)[:10]))),
+            ('post list 100', page(post_fast_serializer.serialize(post_fast_serializer.values(posts)[:100]))),
+            ('comment list 10', page(envelope(
+                comment_fast_serializer.serialize(comment_fast_serializer.values(comments)[:10])))),
+            ('comment list 100', page(envelope(
+                comment_fast_serializer.serialize(comment_fast_serializer.values(comments)[:100])))),
+            ('top five', envelope(top_comment_post_fast_serializer.serialize(
+                top_comment_post_fast_serializer.values(Post.objects.order_by('-comment_count'))[:5]))),
+            ('1000 posts', post_fast_serializer.serialize(post_fast_serializer.values(posts)[:1000])),
+        ]
+
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+        print(f"{'payload':<18}{'bytes':>9}{'DRF us':>10}{'orjson us':>11}{'speedup':>9}"
+              f"{'gzip bytes':>12}{'gzip us':>10}")
+        for name, payload in payloads:
+            content = drf.render(payload)
+            assert fast.render(payload) == content, f"{name}: outputs differ"
+            drf_time = measure(lambda: drf.render(payload), args.repeat)['mean_ms'] * 1000
+            fast_time = measure(lambda: fast.render(payload), args.repeat)['mean_ms'] * 1000
+            gzip_time = measure(lambda: compress_string(content, max_random_bytes=100), args.repeat)['mean_ms'] * 1000
+            print(f"{name:<18}{len(content):>9,}{drf_time:>10.1f}{fast_time:>11.1f}{drf_time / fast_time:>8.1f}x"
+                  f"{len(compress_string(content)):>12,}{gzip_time:>10.1f}")
+
+        print(f"\n{'request body':<18}{'bytes':>9}{'DRF us':>10}{'orjson us':>11}{'speedup':>9}")
+        bodies = [
+            ('comment', {'body': 'A thoughtful comment on the post, with ünïcode.'}),
+            ('post', {'title': 'A new post title', 'body': 'Body text of a new post. ' * 200}),
+        ]
+        for name, body in bodies:
+            content = json.dumps(body).encode()
+            drf_time = measure(lambda: JSONParser().parse(io.BytesIO(content)), args.repeat)['mean_ms'] * 1000
+            fast_time = measure(lambda: ORJSONParser().parse(io.BytesIO(content)), args.repeat)['mean_ms'] * 1000
+            print(f"{name:<18}{len(content):>9,}{drf_time:>10.1f}{fast_time:>11.1f}{drf_time / fast_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Serializer microbenchmark: DRF serializers vs the compiled fast paths of
+PostSerializer, CommentSerializer and TopCommentPostSerializer, in rows/sec
+at page sizes 10, 100 and 1000. "fetch+serialize" includes the query,
+"serialize" only the object/row -> dict step.
+
+    python -m benchmarks.serializers --repeat 50
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import benchmark_database, setup_django
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+def seed(rows):
+    from django.contrib.auth.hashers import make_password
+    from post.models import Comment, Post
+    from user.models import User
+
+    password = make_password('benchmark-password')
+    users = User.objects.bulk_create([
+        User(email=f'writer{i}@example.com', first_name='Writer', last_name=str(i), password=password)
+        for i in range(50)
+    ])
+    posts = Post.objects.bulk_create([
+        Post(title=f'Benchmark post {i}', body='Benchmark body text. ' * 20, author=users[i % 50],
+             slug=f'benchmark-post-{i}', comment_count=i % 7)
+        for i in range(rows)
+    ])
+    Comment.objects.bulk_create([
+        Comment(body=f'Benchmark comment {i}', author=users[i % 50], post=posts[0])
+        for i in range(rows)
+    ])
+
+
+def rows_per_second(fn, rows, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return rows * repeat / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from blogging.querysets import shape_queryset
+    from post.models import Comment, Post
+    from post.serializers import (CommentSerializer, PostSerializer, TopCommentPostSerializer,
+                                  comment_fast_serializer, post_fast_serializer,
+                                  top_comment_post_fast_serializer)
+
+    cases = [
+        ('PostSerializer', PostSerializer, post_fast_serializer,
+         lambda: Post.objects.order_by('-timestamp', '-id')),
+        ('CommentSerializer', CommentSerializer, comment_fast_serializer,
+         lambda: Comment.objects.order_by('-timestamp')),
+        ('TopCommentPostSerializer', TopCommentPostSerializer, top_comment_post_fast_serializer,
+         lambda: Post.objects.order_by('-comment_count', '-timestamp')),
+    ]
+
+    with benchmark_database():
+        seed(max(PAGE_SIZES))
+        print(f"{'serializer':<26}{'rows':>6}  {'step':<16}{'DRF rows/s':>14}{'fast rows/s':>14}{'speedup':>9}")
+        for name, serializer_class, fast, queryset in cases:
+            for size in PAGE_SIZES:
+                def drf_fetch():
+                    return serializer_class(list(shape_queryset(queryset(), serializer_class)[:size]), many=True).data
+
+                def fast_fetch():
+                    return fast.serialize(fast.values(queryset())[:size])
+
+                assert json.dumps(drf_fetch()) == json.dumps(fast_fetch()), f"{name}: outputs differ"
+
+                objects = list(shape_queryset(queryset(), serializer_class)[:size])
+                rows = list(fast.values(queryset())[:size])
+                results = [
+                    ('fetch+serialize', rows_per_second(drf_fetch, size, args.repeat),
+                     rows_per_second(fast_fetch, size, args.repeat)),
+                    ('serialize', rows_per_second(lambda: serializer_class(objects, many=True).data, size, args.repeat),
+                     rows_per_second(lambda: fast.serialize(rows), size, args.repeat)),
+                ]
+                for step, drf_rate, fast_rate in results:
+                    print(f"{name:<26}{size:>6}  {step:<16}{drf_rate:>14,.0f}{fast_rate:>14,.0f}{fast_rate / drf_rate:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+WSGI vs ASGI benchmark: throughput and latency of the post endpoints under
+a few hundred concurrent keep-alive clients.
+
+Three setups are compared on the same data: the DRF views under gunicorn
+(gthread workers), the same DRF views under uvicorn, and the async views of
+post/async_views.py (the /async/ routes) under uvicorn.
+
+Needs PostgreSQL (the servers are separate processes sharing the test
+database) and the servers themselves, which are not project dependencies:
+
+    pip install gunicorn uvicorn
+    python -m benchmarks.wsgi_vs_asgi --clients 300 --duration 15 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, benchmark_database, setup_django, summarize
+
+ENDPOINTS = ['/posts/', '/posts/{slug}/', '/posts/{slug}/comments/', '/top-five-posts/']
+
+
+def seed(posts):
+    from django.contrib.auth.hashers import make_password
+    from post.models import Comment, Post
+    from user.models import User
+
+    password = make_password('benchmark-password')
+    users = User.objects.bulk_create([
+        User(email=f'client{i}@example.com', first_name='Client', last_name=str(i), password=password)
+        for i in range(100)
+    ])
+    created = Post.objects.bulk_create([
+        Post(title=f'Benchmark post {i}', body='Benchmark body text. ' * 20, author=users[i % 100],
+             slug=f'benchmark-post-{i}', comment_count=20 if i == 0 else 0)
+        for i in range(posts)
+    ])
+    Comment.objects.bulk_create([
+        Comment(body=f'Benchmark comment {i}', author=users[i % 100], post=created[0]) for i in range(20)
+    ])
+    return users[0], created[0].slug
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, args, env):
+    if kind == 'wsgi':
+        command = ['gunicorn', 'blogging.wsgi:application', '-k', 'gthread', '--workers', str(args.workers),
+                   '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    else:
+        command = ['uvicorn', 'blogging.asgi:application', '--workers', str(args.workers),
+                   '--port', str(port), '--log-level', 'warning', '--no-access-log']
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{command[0]} did not start")
+
+
+async def client(port, path, token, deadline, samples, errors):
+    request = (f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+               f'Authorization: Bearer {token}\r\n\r\n').encode()
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length, close = 0, False
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+                elif name.lower() == 'connection' and value.strip().lower() == 'close':
+                    close = True
+            await reader.readexactly(length)
+            samples.append((time.perf_counter() - started) * 1000)
+            if status_line.split(b' ')[1:2] != [b'200']:
+                errors.append(status_line)
+            if close:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors.append(repr(e))
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, token, clients, duration):
+    samples, errors = [], []
+    # Warm up every server worker before measuring
+    await asyncio.gather(*(client(port, path, token, time.perf_counter() + 1, [], []) for _ in range(clients)))
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client(port, path, token, deadline, samples, errors) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    result = summarize(samples) if samples else {'count': 0}
+    result.update(requests_per_second=round(len(samples) / elapsed, 1), errors=len(errors))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--duration', type=float, default=15, help="Seconds of load per endpoint and setup")
+    parser.add_argument('--workers', type=int, default=4, help="Server processes")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    missing = [server for server in ('gunicorn', 'uvicorn') if shutil.which(server) is None]
+    if missing:
+        sys.exit(f"Install {' and '.join(missing)} first: pip install gunicorn uvicorn")
+
+    setup_django()
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    with benchmark_database() as connection:
+        if connection.vendor != 'postgresql':
+            sys.exit("The servers need a shared database: run this against PostgreSQL")
+        user, slug = seed(args.posts)
+        token = str(AccessToken.for_user(user))
+        env = dict(os.environ, DB_NAME=connection.settings_dict['NAME'], PYTHONPATH=str(BASE_DIR))
+
+        setups = [('wsgi', 'DRF views / gunicorn', ''), ('asgi', 'DRF views / uvicorn', ''),
+                  ('asgi', 'async views / uvicorn', '/async')]
+        results = []
+        for kind, name, prefix in setups:
+            port = free_port()
+            server = start_server(kind, port, args, env)
+            try:
+                for endpoint in ENDPOINTS:
+                    path = prefix + endpoint.format(slug=slug)
+                    result = asyncio.run(load(port, path, token, args.clients, args.duration))
+                    results.append({'setup': name, 'endpoint': endpoint, **result})
+            finally:
+                server.terminate()
+                server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'setup':<24}{'endpoint':<26}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for result in results:
+        print(f"{result['setup']:<24}{result['endpoint']:<26}{result['requests_per_second']:>10,.1f}"
+              f"{result.get('p50_ms', 0):>10.1f}{result.get('p99_ms', 0):>10.1f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
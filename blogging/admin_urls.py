@@ -0,0 +1,13 @@
+"""
+The admin site, included lazily by blogging/urls.py. The admin app is
+installed with SimpleAdminConfig, so the ModelAdmins of the apps are only
+registered here.
+"""
+from django.contrib import admin
+from django.urls import path
+
+admin.autodiscover()
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+]
@@ -0,0 +1,57 @@
+"""
+Database connection statistics for the diagnostics endpoint.
+
+Connections are either persistent (one per worker thread, kept for
+`DB_CONN_MAX_AGE` seconds and health-checked before reuse) or, with `DB_POOL`
+set, checked out of a psycopg 3 pool shared by the threads of the process.
+See DATABASES in blogging/settings.py.
+"""
+import threading
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_opened = {}  # alias -> connections opened by this process
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+def connection_stats(alias='default'):
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    with _lock:
+        opened = _opened.get(alias, 0)
+    pool = getattr(connection, 'pool', None) if connection.vendor == 'postgresql' else None
+    if pool is None:
+        return {
+            'mode': 'persistent' if settings_dict['CONN_MAX_AGE'] else 'per_request',
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            'connections_opened': opened,
+        }
+
+    # psycopg_pool only reports the counters that are not zero yet
+    stats = pool.get_stats()
+    waited = stats.get('requests_num', 0)
+    return {
+        'mode': 'pool',
+        'min_size': stats.get('pool_min', pool.min_size),
+        'max_size': stats.get('pool_max', pool.max_size),
+        'size': stats.get('pool_size', 0),
+        'checked_out': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': waited,
+        'requests_queued': stats.get('requests_queued', 0),
+        'requests_errors': stats.get('requests_errors', 0),
+        'wait_ms_total': stats.get('requests_wait_ms', 0),
+        'wait_ms_avg': round(stats.get('requests_wait_ms', 0) / waited, 3) if waited else 0.0,
+        'connections_opened': stats.get('connections_num', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+        'returns_bad': stats.get('returns_bad', 0),
+    }
@@ -0,0 +1,22 @@
+"""
+The API documentation, included lazily by blogging/urls.py.
+"""
+from django.urls import path
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+from blogging.schema import API_INFO, schema_json
+
+# Only renders the Swagger and ReDoc pages, which load the pregenerated schema from swagger.json
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+urlpatterns = [
+    path('swagger.json', schema_json, name='schema-json'),
+    path('swagger/', schema_view.as_view(renderer_classes=[SwaggerUIRenderer]), name='schema-swagger-ui'),
+    path('redoc/', schema_view.as_view(renderer_classes=[ReDocRenderer]), name='schema-redoc'),
+]
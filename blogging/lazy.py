@@ -0,0 +1,115 @@
+"""
+Deferred loading of what few requests need: the API documentation and the
+admin site, and the drf_yasg objects the views describe their schema with.
+
+`lazy_include()` adds the URLs of a module without importing it until a
+request path starts with one of its prefixes (or a URL is reversed), so a
+worker only loads drf_yasg or the admin on the first /swagger/ or /admin/
+request.
+
+`swagger_auto_schema`, `no_body` and `openapi` stand in for drf_yasg's in the
+views. Decorating a view only records the arguments, with placeholders for
+`openapi.Response(...)`, `openapi.TYPE_STRING`, ... `apply_decorators()`
+builds the drf_yasg objects and applies drf_yasg's decorator for real; the
+schema generation calls it first (see blogging/schema.py).
+"""
+import threading
+from importlib import import_module
+
+from django.urls import Resolver404, URLResolver
+from django.urls.resolvers import RoutePattern
+
+
+class LazyURLResolver(URLResolver):
+
+    def __init__(self, urlconf_name, prefixes):
+        super().__init__(RoutePattern(''), urlconf_name)
+        self.prefixes = tuple(prefixes)
+
+    def resolve(self, path):
+        # Other paths are turned down without importing the URLconf
+        if not path.startswith(self.prefixes):
+            raise Resolver404({'path': path})
+        return super().resolve(path)
+
+
+def lazy_include(urlconf_name, prefixes):
+    """
+    Like `include()` at the root of the URLconf, for the module `urlconf_name`
+    (a dotted path) whose routes all start with one of `prefixes`.
+    """
+    return LazyURLResolver(urlconf_name, prefixes)
+
+
+class Deferred:
+    """
+    The attribute `name` of the module `module` or, once called, what calling it returns.
+    """
+    __slots__ = ('module', 'name', 'call')
+
+    def __init__(self, module, name, call=None):
+        self.module = module
+        self.name = name
+        self.call = call
+
+    def __call__(self, *args, **kwargs):
+        return Deferred(self.module, self.name, (args, kwargs))
+
+    def __repr__(self):
+        return f'<Deferred {self.module}.{self.name}{"(...)" if self.call else ""}>'
+
+    def resolve(self):
+        value = getattr(import_module(self.module), self.name)
+        if self.call is None:
+            return value
+        args, kwargs = self.call
+        return value(*resolve(args), **resolve(kwargs))
+
+
+def resolve(value):
+    """
+    `value` with the `Deferred` in it, nested in dicts, lists and tuples too, resolved.
+    """
+    if isinstance(value, Deferred):
+        return value.resolve()
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(item) for item in value)
+    return value
+
+
+class DeferredModule:
+
+    def __init__(self, name):
+        self.__name = name
+
+    def __getattr__(self, name):
+        return Deferred(self.__name, name)
+
+
+openapi = DeferredModule('drf_yasg.openapi')
+no_body = Deferred('drf_yasg.utils', 'no_body')
+
+_lock = threading.Lock()
+_pending = []  # (view method, decorator arguments)
+
+
+def swagger_auto_schema(**kwargs):
+    def decorator(view_method):
+        with _lock:
+            _pending.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def apply_decorators():
+    """
+    Apply drf_yasg's `swagger_auto_schema` to every view method decorated so far.
+    """
+    from drf_yasg.utils import swagger_auto_schema as decorate
+
+    with _lock:
+        while _pending:
+            view_method, kwargs = _pending.pop(0)
+            decorate(**resolve(kwargs))(view_method)
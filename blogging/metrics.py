@@ -0,0 +1,302 @@
+"""
+Per-endpoint request metrics, aggregated in process and served in the
+Prometheus text format on /metrics.
+
+`MetricsMiddleware` records, for each URL name of blogging/urls.py, method
+and status: a latency histogram, a histogram of SQL queries per request, and
+the total SQL time, serializer time and response bytes. A request only pays
+for a few `perf_counter()` calls and one locked dict update.
+
+SQL goes through an execute wrapper installed on every database connection,
+and serializers report through `timed('serializer')`. Both add to the
+metrics of the current request, found through a context variable, so the
+queries that async views run in worker threads count as well.
+
+Every worker process has its own numbers. Prometheus sums them across the
+scraped processes.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql_seconds', 'serializer_seconds', 'timing')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.timing = False
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in this block to `<phase>_seconds` of the current
+    request. Nested blocks (e.g. nested serializers) are only counted once.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.timing:
+        yield
+        return
+    metrics.timing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timing = False
+        setattr(metrics, f'{phase}_seconds', getattr(metrics, f'{phase}_seconds') + time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+    """
+    Counts the representation and validation time of a DRF serializer as serializer time.
+    """
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+    def run_validation(self, *args, **kwargs):
+        with timed('serializer'):
+            return super().run_validation(*args, **kwargs)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects of the same connection object
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Connections opened before this module was loaded (e.g. by the test runner)
+for _connection in connections.all(initialized_only=True):
+    install_query_recorder(None, _connection)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class EndpointStats:
+    __slots__ = ('latency', 'queries', 'sql_seconds', 'serializer_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}  # (route, method, status) -> EndpointStats
+
+    def record(self, labels, seconds, metrics, response_bytes):
+        with self.lock:
+            stats = self.endpoints.get(labels)
+            if stats is None:
+                stats = self.endpoints[labels] = EndpointStats()
+            stats.latency.observe(seconds)
+            stats.queries.observe(metrics.queries)
+            stats.sql_seconds += metrics.sql_seconds
+            stats.serializer_seconds += metrics.serializer_seconds
+            stats.response_bytes += response_bytes
+
+    def add_response_bytes(self, labels, response_bytes):
+        with self.lock:
+            self.endpoints[labels].response_bytes += response_bytes
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def render(self):
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            snapshot = [(labels, stats.latency.counts[:], stats.latency.sum, stats.queries.counts[:],
+                         stats.queries.sum, stats.sql_seconds, stats.serializer_seconds, stats.response_bytes)
+                        for labels, stats in endpoints]
+
+        lines = []
+        metric = 'blogging_http_request_duration_seconds'
+        lines += [f'# HELP {metric} Time from the first middleware to the response.', f'# TYPE {metric} histogram']
+        for labels, counts, total, *_ in snapshot:
+            lines += histogram_lines(metric, format_labels(labels), LATENCY_BUCKETS, counts, total)
+
+        metric = 'blogging_http_request_sql_queries'
+        lines += [f'# HELP {metric} SQL queries run per request.', f'# TYPE {metric} histogram']
+        for labels, _, _, counts, total, *_ in snapshot:
+            lines += histogram_lines(metric, format_labels(labels), QUERY_BUCKETS, counts, total)
+
+        for index, (name, help_text) in enumerate([
+            ('blogging_http_request_sql_seconds_total', 'Time spent running SQL.'),
+            ('blogging_http_request_serializer_seconds_total', 'Time spent in serializers.'),
+            ('blogging_http_response_bytes_total', 'Bytes of response bodies.'),
+        ], start=5):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{{format_labels(entry[0])}}} {format_value(entry[index])}' for entry in snapshot]
+        return lines
+
+
+def histogram_lines(metric, labels, buckets, counts, total):
+    lines, cumulative = [], 0
+    for bound, count in zip((*buckets, '+Inf'), counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_sum{{{labels}}} {format_value(total)}')
+    lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+    return lines
+
+
+def format_labels(labels):
+    route, method, code = labels
+    return f'route="{route}",method="{method}",status="{code}"'
+
+
+def format_value(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Records the metrics of every request. Goes first in MIDDLEWARE, so the
+    latency covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, time.perf_counter() - started, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, time.perf_counter() - started, metrics)
+
+    def record(self, request, response, seconds, metrics):
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unmatched', request.method, response.status_code)
+        if not response.streaming:
+            registry.record(labels, seconds, metrics, len(response.content))
+            return response
+
+        # Streamed bodies (exports) are counted as they are sent
+        registry.record(labels, seconds, metrics, 0)
+        if not response.is_async:
+            response.streaming_content = count_bytes(response.streaming_content, labels)
+        return response
+
+
+def count_bytes(chunks, labels):
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        registry.add_response_bytes(labels, sent)
+
+
+def process_lines():
+    from blogging.db import connection_stats
+    from user.hashing import hashing_pool
+
+    lines = []
+    hashing = hashing_pool.stats()
+    for name, key, kind, help_text in [
+        ('blogging_password_hashing_in_flight', 'in_flight', 'gauge', 'Password hashes running or queued.'),
+        ('blogging_password_hashing_completed_total', 'completed', 'counter', 'Password hashes completed.'),
+        ('blogging_password_hashing_rejected_total', 'rejected', 'counter', 'Logins rejected with a full queue.'),
+        ('blogging_password_hashing_wait_seconds_total', 'wait_seconds_total', 'counter',
+         'Time hashes waited for a worker.'),
+    ]:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {format_value(hashing[key])}']
+
+    database = connection_stats()
+    if database['mode'] == 'pool':
+        for name, key, kind, help_text in [
+            ('blogging_db_pool_size', 'size', 'gauge', 'Connections in the pool.'),
+            ('blogging_db_pool_checked_out', 'checked_out', 'gauge', 'Connections in use.'),
+            ('blogging_db_pool_waiting', 'waiting', 'gauge', 'Requests waiting for a connection.'),
+            ('blogging_db_pool_wait_milliseconds_total', 'wait_ms_total', 'counter',
+             'Time requests waited for a connection.'),
+        ]:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {database[key]}']
+    name = 'blogging_db_connections_opened_total'
+    lines += [f'# HELP {name} Database connections opened.', f'# TYPE {name} counter',
+              f'{name} {database["connections_opened"]}']
+    return lines
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set, scrapers must send it as a Bearer token.
+    """
+    expected = getattr(settings, 'METRICS_TOKEN', '')
+    if expected and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {expected}'):
+        return HttpResponse(status=401)
+    body = '\n'.join(registry.render() + process_lines()) + '\n'
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
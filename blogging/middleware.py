@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware as DjangoGZipMiddleware
+
+
+class GZipMiddleware(DjangoGZipMiddleware):
+    """
+    Django's gzip compression for clients that accept it, from GZIP_MIN_LENGTH
+    bytes up instead of 200. Smaller bodies fit in a packet or two anyway and
+    aren't worth the CPU. Streamed responses (exports) are always compressed.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,73 @@
+from django.core.exceptions import FieldDoesNotExist
+
+
+def serializer_sources(serializer_class):
+    """
+    Dotted `source` paths of the fields a serializer class reads, e.g. "author.email".
+    """
+    return [
+        field.source for field in serializer_class().fields.values()
+        if not field.write_only and field.source != '*'
+    ]
+
+
+def resolve_source(model, source):
+    """
+    Follow a dotted `source` through model fields and return its ORM lookup
+    ("author.email" -> "author__email"), or None when it isn't a chain of
+    concrete fields (a property, a reverse relation, a missing attribute, ...).
+    """
+    current = model
+    for part in source.split('.'):
+        if current is None:
+            return None
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        current = field.related_model
+    return source.replace('.', '__')
+
+
+def resolve_sources(model, sources, annotations=()):
+    """
+    Work out what a queryset of `model` has to load to serialize `sources`.
+
+    Returns (select_related paths, only() paths). The only() paths are None when
+    a source isn't a plain model field since deferring anything could then
+    cause a query per row.
+    """
+    related, only, deferrable = set(), {model._meta.pk.name}, True
+    for source in sources:
+        if source.split('.')[0] in annotations:
+            continue
+        lookup = resolve_source(model, source)
+        if lookup is None:
+            deferrable = False
+            continue
+        parts = lookup.split('__')
+        for depth in range(1, len(parts) + 1):
+            only.add('__'.join(parts[:depth]))
+            if depth < len(parts):
+                related.add('__'.join(parts[:depth]))
+    return related, (only if deferrable else None)
+
+
+def shape_queryset(queryset, serializer_class, defer_fields=True, extra_fields=()):
+    """
+    Apply the select_related()/only() a serializer class needs, so serializing
+    a page never issues one query per row for `author.email` and the like.
+
+    `extra_fields` are loaded too when the view itself reads them. Use
+    `defer_fields=False` for instances that are going to be saved.
+    """
+    related, only = resolve_sources(
+        queryset.model, serializer_sources(serializer_class), queryset.query.annotations
+    )
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    if defer_fields and only is not None:
+        queryset = queryset.only(*sorted(only | set(extra_fields)))
+    return queryset
@@ -0,0 +1,78 @@
+"""
+JSON renderer and parser on orjson, with the output of DRF's JSONRenderer.
+
+orjson encodes the envelope and page dicts in C, several times faster than
+the stdlib `json` DRF uses. The bytes are the same (compact separators, UTF-8,
+U+2028/U+2029 escaped, DRF's formatting of dates, decimals, lazy strings and
+other types). The one exception is floats in exponent notation: orjson writes
+`1e16` and `0.00001`, DRF `1e+16` and `1e-05`. Both are the same number.
+
+Without orjson installed, or for what orjson can't handle the same way
+(indented responses, integers over 64 bits, ...), both classes fall back to
+DRF's.
+"""
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+LONG_NUMBER = re.compile(rb'[0-9]{20}')
+NOT_DIGITS = bytes(byte for byte in range(256) if not 48 <= byte <= 57)
+
+# Types orjson doesn't encode itself are handed to DRF's encoder, dates and times included
+# so they are formatted the DRF way (e.g. "Z" for UTC)
+OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+default = encoders.JSONEncoder().default
+
+
+def dumps(data):
+    """
+    `data` as compact UTF-8 JSON, like DRF's JSONRenderer renders it.
+    """
+    content = orjson.dumps(data, default=default, option=OPTIONS)
+    if b'\xe2\x80' in content:  # Shared prefix of both separators, rare in practice
+        content = content.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is not None and self.compact and not self.ensure_ascii
+                and self.get_indent(accepted_media_type, renderer_context or {}) is None):
+            try:
+                return dumps(data)
+            except TypeError:  # orjson.JSONEncodeError, e.g. integers over 64 bits
+                pass
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        # orjson reads integers over 64 bits as floats, the stdlib keeps them exact. Counting the
+        # digits is much cheaper than the regex, which only runs for bodies with 20 digits or more.
+        if len(content.translate(None, NOT_DIGITS)) < 20 or not LONG_NUMBER.search(content):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass  # DRF raises its own error message
+        return super().parse(io.BytesIO(content), media_type, parser_context)
@@ -0,0 +1,133 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+`ReplicaRouter` sends writes to `default` and reads to one of the aliases in
+`DATABASE_REPLICAS` (none configured: everything stays on `default`). Reads
+go to the primary anyway when they happen:
+
+- inside a transaction on the primary, so a write and the reads it depends on
+  see the same data;
+- while `use_primary()` is active;
+- during a request handled by `ReplicaPinMiddleware` that is a write
+  (POST/PUT/PATCH/DELETE), or a read by a user who wrote less than
+  `REPLICA_PIN_SECONDS` ago, so users always see their own writes.
+
+Pins are kept in the cache, shared by every process when it is Redis. The user
+comes from the JWT of the request, decoded without any database query.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """
+    Route the reads of this block (and of the threads and tasks it starts) to the primary.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        # Related objects are read from where their instance came from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in aliases:
+            return instance._state.db
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication, migrate them only when they are
+        # separate databases (e.g. two SQLite files standing in for primary and replica)
+        return db == DEFAULT_DB_ALIAS or db in replicas()
+
+
+def pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+class ReplicaPinMiddleware:
+    """
+    Routes the reads of writes and of recently writing users to the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.authentication = JWTAuthentication()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_user_id(self, request):
+        # This runs before DRF's exception handling: a malformed header or an
+        # invalid token is routed like an anonymous request, the view rejects it
+        try:
+            header = self.authentication.get_header(request)
+            raw_token = self.authentication.get_raw_token(header) if header is not None else None
+            if raw_token is None:
+                return None
+            # Checks the signature and expiry only, no query
+            return self.authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+        except (AuthenticationFailed, TokenError):  # InvalidToken is an AuthenticationFailed
+            return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        user_id = self.get_user_id(request)
+        write = request.method not in SAFE_METHODS
+        if not write and (user_id is None or not cache.get(pin_key(user_id))):
+            return self.get_response(request)
+        with use_primary():
+            response = self.get_response(request)
+        if write and user_id is not None:
+            cache.set(pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        user_id = self.get_user_id(request)
+        write = request.method not in SAFE_METHODS
+        if not write and (user_id is None or not await cache.aget(pin_key(user_id))):
+            return await self.get_response(request)
+        with use_primary():
+            response = await self.get_response(request)
+        if write and user_id is not None:
+            await cache.aset(pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,92 @@
+"""
+The OpenAPI schema, generated once by `manage.py generate_schema` instead of
+on every request.
+
+drf_yasg introspects every view and serializer to build the schema, which
+takes far longer than any API request. The command writes the result to
+OPENAPI_SCHEMA_PATH, a file kept in the repository and regenerated whenever
+the API changes (a test fails while it is out of date). `schema_json` serves
+it from memory with an ETag, so browsers revalidate it with a 304 instead of
+downloading it again. The Swagger and ReDoc pages load it from there.
+All of it is in blogging/docs_urls.py, imported on the first request for it.
+"""
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import condition, require_safe
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+from blogging.lazy import apply_decorators
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="Blogging API",
+    default_version='v1',
+    description="API documentation for the Blogging project",
+    terms_of_service="",
+    contact=openapi.Contact(email="contact@blogging.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+
+def generate_schema():
+    """
+    The public schema of every route, as the JSON bytes of the schema file.
+    """
+    apply_decorators()
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    # Indented, so changes to the committed file read well in diffs. Served gzipped anyway.
+    return OpenAPICodecJson(validators=[], pretty=True).encode(schema) + b'\n'
+
+
+class SchemaFile:
+    """
+    The content of the schema file and its ETag, read on first use.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.content = None
+        self.etag = None
+
+    def load(self):
+        if self.content is None:
+            with self.lock:
+                if self.content is None:
+                    self.set(self.read())
+        return self
+
+    def read(self):
+        try:
+            with open(settings.OPENAPI_SCHEMA_PATH, 'rb') as schema_file:
+                return schema_file.read()
+        except FileNotFoundError:
+            logger.warning("%s is missing, generating the schema in process. Run manage.py generate_schema.",
+                           settings.OPENAPI_SCHEMA_PATH)
+            return generate_schema()
+
+    def set(self, content):
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        self.content = content
+
+    def clear(self):
+        with self.lock:
+            self.content = self.etag = None
+
+
+schema_file = SchemaFile()
+
+
+@require_safe
+@condition(etag_func=lambda request: schema_file.load().etag)
+def schema_json(request):
+    response = HttpResponse(schema_file.load().content, content_type='application/json')
+    # Cached, but checked with the ETag every time, so a deploy with a new schema shows up at once
+    response['Cache-Control'] = 'no-cache'
+    return response
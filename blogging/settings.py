@@ -36,7 +36,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Without autodiscovery at startup, see blogging/admin_urls.py
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -51,7 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blogging.metrics.MetricsMiddleware',
+    'blogging.middleware.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blogging.routers.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,7 +90,7 @@ WSGI_APPLICATION = 'blogging.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USERNAME'),
         'PASSWORD': os.getenv('PASSWORD'),
@@ -95,6 +99,60 @@ DATABASES = {
     }
 }
 
+# Connection reuse (see blogging/db.py for the statistics). By default each worker thread keeps its
+# connection for DB_CONN_MAX_AGE seconds and pings it before reusing it after a request.
+# DB_POOL=1 shares a psycopg 3 pool between the threads of a process instead (needs psycopg[pool]):
+# DB_POOL_MIN_SIZE connections are kept open, at most DB_POOL_MAX_SIZE, requests wait up to
+# DB_POOL_TIMEOUT seconds for one, and connections are closed after DB_POOL_MAX_IDLE idle seconds
+# or DB_POOL_MAX_LIFETIME seconds in total.
+if os.getenv('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 60))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas (see blogging/routers.py): one database per host of DB_REPLICA_HOSTS (comma separated), same
+# name and credentials as the primary. Reads go to a replica, except for users who wrote in the last
+# REPLICA_PIN_SECONDS, whose reads stay on the primary.
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': replica_host.strip(),
+                                    'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['blogging.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+
+# Cache
+# Shared Redis cache when REDIS_URL is set (needs the redis package), otherwise a per-process memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a serialized post detail stays cached (writes invalidate it earlier)
+POST_DETAIL_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -118,8 +176,18 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'blogging.utils.custom_token_exception_handler',
     'NON_FIELD_ERRORS_KEY': 'detail',
+    # Same output as DRF's JSON renderer and parser, encoded with orjson when it is installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'blogging.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'blogging.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,  # Number of items per page
@@ -133,6 +201,40 @@ SIMPLE_JWT = {
     "SIGNING_KEY": "gdfgnknfh545gh45g4",
 }
 
+# In-process cache of authenticated users (see user/authentication.py): entries kept, seconds before refetch
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', 10000))
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', 60))
+
+# In-memory filter of blacklisted refresh tokens (see user/blacklist.py): seconds between picking up
+# logouts from other processes and between full rebuilds, and the false positive rate
+TOKEN_BLACKLIST_SYNC_SECONDS = int(os.getenv('TOKEN_BLACKLIST_SYNC_SECONDS', 5))
+TOKEN_BLACKLIST_REBUILD_SECONDS = int(os.getenv('TOKEN_BLACKLIST_REBUILD_SECONDS', 3600))
+TOKEN_BLACKLIST_ERROR_RATE = 0.001
+
+# Password hashing pool (see user/hashing.py): worker processes, requests allowed to wait for one,
+# and how long (seconds) they wait before getting a 503
+HASHING_WORKERS = int(os.getenv('HASHING_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+HASHING_QUEUE_SIZE = int(os.getenv('HASHING_QUEUE_SIZE', 32))
+HASHING_QUEUE_TIMEOUT = float(os.getenv('HASHING_QUEUE_TIMEOUT', 0.5))
+
+# Smallest response body (bytes) worth gzipping for clients that accept it
+GZIP_MIN_LENGTH = int(os.getenv('GZIP_MIN_LENGTH', 1024))
+
+# Newest comments embedded per post by the post list with include=comment_preview
+COMMENT_PREVIEW_SIZE = int(os.getenv('COMMENT_PREVIEW_SIZE', 3))
+
+# How often (seconds) the in-process trending leaderboards are recounted from the database
+TRENDING_RESYNC_SECONDS = 300
+
+# Rows fetched per server-side cursor round trip (and written per chunk) by the NDJSON exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Bearer token Prometheus must send to scrape /metrics (see blogging/metrics.py), unset: no authentication
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# OpenAPI schema written by `manage.py generate_schema` and served on /swagger.json (see blogging/schema.py)
+OPENAPI_SCHEMA_PATH = BASE_DIR / 'blogging' / 'openapi.json'
+
 # For JWT authentication with swagger 
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -142,6 +244,12 @@ SWAGGER_SETTINGS = {
             'name': 'Authorization'
         }
     },
+    # The UI pages load the pregenerated schema instead of generating it
+    'SPEC_URL': 'schema-json',
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': 'schema-json',
 }
 
 # Internationalization
@@ -14,32 +14,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path
-from rest_framework import permissions
 from user.views import (RegisterUserView, LoginAPIView,
                          CustomRefreshTokenView, LogoutApiView)
-from post.views import (PostListCreateAPIView, PostDetailAPIView, 
-                        CommentListCreateAPIView, TopCommentedPostsAPIView)
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Blogging API",
-        default_version='v1',
-        description="API documentation for the Blogging project",
-        terms_of_service="",
-        contact=openapi.Contact(email="contact@blogging.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from post.views import (PostListCreateAPIView, PostSearchAPIView, PostBulkImportAPIView, PostDetailAPIView,
+                        CommentListCreateAPIView, TopCommentedPostsAPIView, ExportAPIView)
+from blogging.metrics import metrics_view
+from blogging.views import DiagnosticsAPIView
+from django.views.decorators.csrf import csrf_exempt
+from post.async_views import (AsyncPostListAPIView, AsyncPostDetailAPIView, AsyncCommentListCreateAPIView,
+                              AsyncTopCommentedPostsAPIView)
+from user.async_views import AsyncLoginAPIView, AsyncRegisterUserView
+from blogging.lazy import lazy_include
+
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # The admin site, imported on the first request for it
+    lazy_include('blogging.admin_urls', prefixes=['admin/']),
     # User Registration and Authentication related urls
     path('register/', RegisterUserView.as_view(), name='register_user'),
     path('login/', LoginAPIView.as_view(), name='login_user'),
@@ -48,6 +39,9 @@ urlpatterns = [
 
     # Post Related Apis
     path('posts/', PostListCreateAPIView.as_view(), name='get_create_post'),
+    # Must stay above the slug route, otherwise "search" and "bulk" are taken for slugs
+    path('posts/search/', PostSearchAPIView.as_view(), name='search_post'),
+    path('posts/bulk/', PostBulkImportAPIView.as_view(), name='bulk_import_post'),
     path('posts/<slug:slug>/', PostDetailAPIView.as_view(), name='post_detail'),
 
     # Comments Related Apis
@@ -56,7 +50,24 @@ urlpatterns = [
     # Custom Api To get Top 5 most commented Post
     path('top-five-posts/', TopCommentedPostsAPIView.as_view(), name='top_five_post'),
 
-    # Swagger related urls
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Async versions of login, registration and the read-heavy endpoints (JWT authenticated), for ASGI servers.
+    # No CSRF, like the DRF views
+    path('async/register/', csrf_exempt(AsyncRegisterUserView.as_view()), name='async_register_user'),
+    path('async/login/', csrf_exempt(AsyncLoginAPIView.as_view()), name='async_login_user'),
+    path('async/posts/', csrf_exempt(AsyncPostListAPIView.as_view()), name='async_get_post'),
+    path('async/posts/<slug:slug>/', csrf_exempt(AsyncPostDetailAPIView.as_view()), name='async_post_detail'),
+    path('async/posts/<slug:slug>/comments/', csrf_exempt(AsyncCommentListCreateAPIView.as_view()), name='async_get_create_comment'),
+    path('async/top-five-posts/', csrf_exempt(AsyncTopCommentedPostsAPIView.as_view()), name='async_top_five_post'),
+
+    # NDJSON exports of the whole tables
+    path('export/posts/', ExportAPIView.as_view(kind='posts'), name='export_posts'),
+    path('export/comments/', ExportAPIView.as_view(kind='comments'), name='export_comments'),
+
+    # Runtime statistics of the serving process, staff only
+    path('diagnostics/', DiagnosticsAPIView.as_view(), name='diagnostics'),
+    # Request metrics of the serving process in the Prometheus text format
+    path('metrics', metrics_view, name='metrics'),
+
+    # Swagger related urls (swagger.json, swagger/ and redoc/), imported on the first request for them
+    lazy_include('blogging.docs_urls', prefixes=['swagger', 'redoc/']),
 ]
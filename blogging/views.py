@@ -0,0 +1,29 @@
+from rest_framework import status
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAdminUser
+from blogging.lazy import openapi, swagger_auto_schema
+
+from blogging.db import connection_stats
+from blogging.utils import get_response
+from user.hashing import hashing_pool
+
+
+class DiagnosticsAPIView(GenericAPIView):
+    """
+    Runtime statistics of this process, for staff users.
+    """
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=("Statistics of this worker process: password hashing pool usage and wait times, "
+                               "database connections (pool checkouts and wait times with DB_POOL)"),
+        responses={200: openapi.Response(description="Diagnostics", examples={"application/json": {
+            "status": 200, "msg": "Diagnostics", "data": {"hashing": {"workers": 2, "in_flight": 0, "rejected": 0},
+                     "database": {"mode": "pool", "size": 4, "checked_out": 1, "waiting": 0}},
+        }})},
+    )
+    def get(self, request):
+        return get_response(status.HTTP_200_OK, "Diagnostics", {
+            'hashing': hashing_pool.stats(),
+            'database': connection_stats(),
+        })
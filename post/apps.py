@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PostConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'post'
+
+    def ready(self):
+        # Register the signal handlers keeping Post.comment_count current
+        from post import signals  # noqa: F401
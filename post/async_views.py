@@ -0,0 +1,181 @@
+"""
+Async versions of the post list, post detail, comment list/create and top
+posts endpoints, served under /async/ with the same responses as post/views.py,
+cursor pagination (`pagination=cursor`) and `include=comment_preview` included.
+
+DRF views are synchronous, so under ASGI each request of post/views.py holds
+a thread for its whole database wait. These are plain Django async views on
+the async ORM instead: while a query runs, the event loop serves other
+requests. Work that only exists synchronously (Comment signals in a
+transaction, the leaderboard rebuild) runs through `sync_to_async`.
+"""
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotFound
+from rest_framework.permissions import SAFE_METHODS
+
+from blogging.querysets import shape_queryset
+from blogging.renderers import ORJSONParser, ORJSONRenderer
+from blogging.routers import use_primary
+from post.cache import acache_post_detail, aget_post_detail
+from post.models import Comment, Post
+from post.pagination import async_paginator
+from post.serializers import (CommentSerializer, PostSerializer, comment_fast_serializer,
+                              comment_preview_fast_serializer, post_fast_serializer, serialize_post_previews,
+                              top_comment_post_fast_serializer)
+from post.trending import WINDOWS, leaderboard
+from user.authentication import CachedJWTAuthentication
+from user.models import User
+
+renderer = ORJSONRenderer()
+
+
+def render(payload, code):
+    # Rendered like the DRF views render, so both produce the same bytes
+    return HttpResponse(renderer.render(payload), status=code, content_type='application/json')
+
+
+def get_response(code_status, msg, payload):
+    return render({'status': code_status, 'msg': msg, 'data': payload}, code_status)
+
+
+class AsyncAPIView(View):
+    """
+    JWT authentication and error responses of the DRF views, for async handlers.
+    Safe methods authenticate from the token claims alone, like the views with
+    `token_user_for_safe_methods`.
+    """
+    authentication_class = CachedJWTAuthentication
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authentication_class().aauthenticate(
+                request, token_user=request.method in SAFE_METHODS
+            )
+        except AuthenticationFailed:
+            request.user = None
+        if request.user is None:
+            return get_response(status.HTTP_401_UNAUTHORIZED, 'Invalid Access key.', {})
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return render({'detail': exc.detail}, exc.status_code)
+
+
+class AsyncPostListAPIView(AsyncAPIView):
+    includes = {'comment_preview'}
+
+    async def get(self, request):
+        author_filter = request.GET.get("author")
+        includes = set(filter(None, request.GET.get("include", "").split(",")))
+        if includes - self.includes:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Unknown include", {})
+
+        post_queryset = Post.objects.all().order_by('-timestamp', '-id')
+        if author_filter:
+            post_queryset = post_queryset.filter(author__in=User.objects.search(author_filter).values('id'))
+
+        paginator = async_paginator(request)
+        if 'comment_preview' not in includes:
+            posts = await paginator.apaginate_queryset(post_fast_serializer.values(post_queryset), request)
+            return render(paginator.get_paginated_data(post_fast_serializer.serialize(posts)), status.HTTP_200_OK)
+
+        rows = await paginator.apaginate_queryset(post_fast_serializer.values(post_queryset, 'comment_count'), request)
+        comments = Comment.latest_per_post([row.id for row in rows], settings.COMMENT_PREVIEW_SIZE)
+        comments = [comment async for comment in comment_preview_fast_serializer.values(comments, 'post_id')]
+        return render(paginator.get_paginated_data(serialize_post_previews(rows, comments)), status.HTTP_200_OK)
+
+
+class AsyncPostDetailAPIView(AsyncAPIView):
+
+    async def get(self, request, slug):
+        entry = await aget_post_detail(slug)
+        if entry is None:
+            with use_primary():
+                post = await shape_queryset(Post.objects.filter(slug=slug), PostSerializer,
+                                            extra_fields=['updated_at']).afirst()
+            if not post:
+                return get_response(status.HTTP_404_NOT_FOUND, "Post not found", {})
+            entry = await acache_post_detail(post, PostSerializer(post).data)
+
+        response = get_response(status.HTTP_200_OK, "Post fetched successfully", entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        # Checked by ETag only: the payload embeds the author, whose changes don't move the post's updated_at
+        return get_conditional_response(request, etag=entry['etag'], response=response)
+
+
+class AsyncCommentListCreateAPIView(AsyncAPIView):
+
+    async def get(self, request, slug):
+        paginator = async_paginator(request)
+        try:
+            comments = await paginator.apaginate_queryset(comment_fast_serializer.values(Comment.of_post(slug)), request)
+        except NotFound:
+            if not await Post.objects.filter(slug=slug).aexists():
+                return get_response(status.HTTP_400_BAD_REQUEST, "Invalid slug data", [])
+            raise
+        if not comments and not await Post.objects.filter(slug=slug).aexists():
+            return get_response(status.HTTP_400_BAD_REQUEST, "Invalid slug data", [])
+        return render(paginator.get_paginated_data({
+            "status": status.HTTP_200_OK,
+            "msg": "Retrieved comments successfully",
+            "data": comment_fast_serializer.serialize(comments)
+        }), status.HTTP_200_OK)
+
+    async def post(self, request, slug):
+        post_object = await Post.objects.filter(slug=slug).afirst()
+        if not post_object:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Invalid slug data", [])
+
+        # Malformed JSON raises ParseError, answered with a 400 by dispatch()
+        data = ORJSONParser().parse(io.BytesIO(request.body)) if request.body else {}
+        serializer = CommentSerializer(data=data)
+        if serializer.is_valid():
+            # The comment and the post's comment_count are written together, the signals need the transaction
+            await sync_to_async(self.save_comment)(serializer, request.user, post_object)
+            return get_response(status.HTTP_201_CREATED, "Comment created successfully", serializer.data)
+
+        return get_response(status.HTTP_400_BAD_REQUEST, "Invalid Request Body", serializer.errors)
+
+    @staticmethod
+    def save_comment(serializer, user, post_object):
+        with transaction.atomic():
+            serializer.save(author=user, post=post_object)
+
+
+class AsyncTopCommentedPostsAPIView(AsyncAPIView):
+    default_limit = 5
+    max_limit = 100
+
+    async def get(self, request):
+        window = request.GET.get("window", "all")
+        try:
+            limit = int(request.GET.get("limit", self.default_limit))
+        except ValueError:
+            limit = 0
+        if (window != "all" and window not in WINDOWS) or not 0 < limit <= self.max_limit:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Invalid window or limit", {})
+
+        fast_serializer = top_comment_post_fast_serializer
+        if window == "all":
+            queryset = fast_serializer.values(Post.objects.order_by('-comment_count', '-timestamp')[:limit])
+            top_commented_posts = [row async for row in queryset]
+        else:
+            # A stale leaderboard is rebuilt from the database first
+            ranked = await sync_to_async(leaderboard.top)(window, limit)
+            rows = fast_serializer.values(Post.objects.filter(id__in=[post_id for post_id, _ in ranked]))
+            posts = {row.id: row async for row in rows}
+            top_commented_posts = [posts[post_id]._replace(comment_count=comment_count)
+                                   for post_id, comment_count in ranked if post_id in posts]
+
+        data = fast_serializer.serialize(top_commented_posts)
+        return get_response(status.HTTP_200_OK, "Top commented posts retrieved successfully", data)
@@ -0,0 +1,56 @@
+"""
+Read-through cache of the serialized post detail payload, keyed by slug.
+
+Entries carry an ETag and Last-Modified value so conditional GETs can be
+answered without touching the database. Only the ETag validates them: the
+payload embeds the author's email, which changes without moving the post's
+`updated_at`. `Post.save` invalidates the entry of
+the post it writes, the receivers in post/signals.py those of deleted posts
+(cascades included) and of posts whose author changed.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def detail_key(slug):
+    return f'post:detail:{slug}'
+
+
+def get_post_detail(slug):
+    return cache.get(detail_key(slug))
+
+
+async def aget_post_detail(slug):
+    return await cache.aget(detail_key(slug))
+
+
+def build_detail_entry(post, data):
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return {
+        'data': data,
+        'etag': '"%s"' % hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest(),
+        'last_modified': int(post.updated_at.timestamp()),
+    }
+
+
+def cache_post_detail(post, data):
+    entry = build_detail_entry(post, data)
+    cache.set(detail_key(post.slug), entry, getattr(settings, 'POST_DETAIL_CACHE_TIMEOUT', 300))
+    return entry
+
+
+async def acache_post_detail(post, data):
+    entry = build_detail_entry(post, data)
+    await cache.aset(detail_key(post.slug), entry, getattr(settings, 'POST_DETAIL_CACHE_TIMEOUT', 300))
+    return entry
+
+
+def invalidate_post_detail(slug):
+    cache.delete(detail_key(slug))
+
+
+def invalidate_post_details(slugs):
+    cache.delete_many([detail_key(slug) for slug in slugs])
@@ -0,0 +1,181 @@
+"""
+Bulk import of posts and their comments from JSONL, one post per line:
+
+    {"title": "...", "body": "...", "author": "writer@example.com",
+     "comments": [{"body": "...", "author": "reader@example.com"}]}
+
+Lines are validated with the rules of PostSerializer and CommentSerializer,
+then written `batch_size` posts at a time: one slug reservation per distinct
+title, one bulk INSERT for the posts and one for their comments, all in one
+transaction per batch. Only the current batch is held in memory, so the input
+can be of any size.
+"""
+import json
+import time
+from functools import partial
+
+from django.db import transaction
+
+from post import search
+from post.models import Comment, Post, SlugSequence
+from post.serializers import CommentSerializer, PostSerializer
+from post.slugs import base_slug, numbered_slug
+from post.trending import leaderboard
+from user.models import User
+
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.posts = 0
+        self.comments = 0
+        self.rejected = 0
+        self.errors = []  # [(line number, errors)], the first MAX_REPORTED_ERRORS only
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return (self.posts + self.comments) / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line_number, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, errors))
+
+    def as_dict(self):
+        return {
+            'posts': self.posts,
+            'comments': self.comments,
+            'rejected': self.rejected,
+            'errors': [{'line': line_number, 'errors': errors} for line_number, errors in self.errors],
+            'seconds': round(self.elapsed, 3),
+        }
+
+
+class PostImporter:
+    """
+    Rows without an "author" are written as `default_author`. With
+    `use_row_authors=False` every row is, whatever its "author" says.
+    """
+
+    def __init__(self, default_author=None, batch_size=500, use_row_authors=True):
+        self.default_author = default_author
+        self.batch_size = batch_size
+        self.use_row_authors = use_row_authors
+
+    def run(self, lines):
+        result = ImportResult()
+        batch = []
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            row = self.parse(line_number, line, result)
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.write(batch, result)
+                batch = []
+        if batch:
+            self.write(batch, result)
+        return result
+
+    def parse(self, line_number, line, result):
+        """
+        Validated (line number, post data, author, [(comment data, author)]) or
+        None when the line is rejected. Authors are emails at this point.
+        """
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            result.reject(line_number, {'line': [f'Invalid JSON: {e}']})
+            return None
+        if not isinstance(row, dict):
+            result.reject(line_number, {'line': ['Expected a JSON object']})
+            return None
+
+        errors = {}
+        post_serializer = PostSerializer(data=row)
+        if not post_serializer.is_valid():
+            errors.update(post_serializer.errors)
+
+        comments, comment_errors = [], {}
+        raw_comments = row.get('comments') or []
+        if not isinstance(raw_comments, list):
+            raw_comments, errors['comments'] = [], ['Expected a list of comments']
+        for index, raw_comment in enumerate(raw_comments):
+            comment_serializer = CommentSerializer(data=raw_comment if isinstance(raw_comment, dict) else {})
+            if comment_serializer.is_valid():
+                comments.append((comment_serializer.validated_data, self.author_of(raw_comment)))
+            else:
+                comment_errors[index] = comment_serializer.errors
+        if comment_errors:
+            errors['comments'] = comment_errors
+
+        if errors:
+            result.reject(line_number, errors)
+            return None
+        return line_number, post_serializer.validated_data, self.author_of(row), comments
+
+    def author_of(self, row):
+        if self.use_row_authors and isinstance(row.get('author'), str):
+            return row['author'].strip()
+        return None
+
+    def resolve_authors(self, batch):
+        emails = {author for _, _, author, _ in batch if author}
+        emails.update(author for *_, comments in batch for _, author in comments if author)
+        authors = {user.email: user for user in User.objects.filter(email__in=emails)} if emails else {}
+        authors[None] = self.default_author
+        return authors
+
+    def write(self, batch, result):
+        authors = self.resolve_authors(batch)
+        rows = []
+        for line_number, post_data, author, comments in batch:
+            missing = [email for email in [author] + [email for _, email in comments] if authors.get(email) is None]
+            if missing:
+                result.reject(line_number, {'author': [f"Unknown author '{missing[0]}'"]})
+            else:
+                rows.append((post_data, authors[author], [(data, authors[email]) for data, email in comments]))
+        if not rows:
+            return
+
+        with transaction.atomic():
+            slugs = self.allocate_slugs([post_data['title'] for post_data, _, _ in rows])
+            posts = Post.objects.bulk_create([
+                Post(slug=slug, author=author, comment_count=len(comments), **post_data)
+                for slug, (post_data, author, comments) in zip(slugs, rows)
+            ])
+            new_comments = Comment.objects.bulk_create([
+                Comment(post=post, author=author, **comment_data)
+                for post, (_, _, comments) in zip(posts, rows)
+                for comment_data, author in comments
+            ])
+            # bulk_create skips Post.save and the Comment signals, do their work here
+            for post in posts:
+                transaction.on_commit(partial(search.index_post, post))
+            for comment in new_comments:
+                transaction.on_commit(partial(leaderboard.record, comment.post_id, comment.timestamp))
+        result.posts += len(posts)
+        result.comments += len(new_comments)
+
+    def allocate_slugs(self, titles):
+        slugs = Post.allocate_slugs(titles)
+        # Slugs saved before the sequences existed can still be in the way
+        taken = set(Post.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        for index, slug in enumerate(slugs):
+            while slug in taken:
+                base = base_slug(titles[index])
+                slug = numbered_slug(base, SlugSequence.objects.reserve(base))
+                if Post.objects.filter(slug=slug).exists():
+                    taken.add(slug)
+            slugs[index] = slug
+        return slugs
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+
+from post.exporter import EXPORTS, export_ndjson, parse_filters
+
+
+class Command(BaseCommand):
+    help = "Stream all posts or comments as NDJSON, in id order (see post/exporter.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--output', default='-', help="File to write, '-' (default) for standard output")
+        parser.add_argument('--updated-since', help="Only rows changed at or after this ISO 8601 date and time")
+        parser.add_argument('--min-id', type=int)
+        parser.add_argument('--max-id', type=int)
+        parser.add_argument('--chunk-size', type=int, help="Rows per server-side cursor fetch")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options)
+        except ValueError as e:
+            raise CommandError(e)
+
+        started, rows = time.monotonic(), 0
+        with self.open_output(options['output']) as write:
+            for chunk in export_ndjson(options['kind'], chunk_size=options['chunk_size'], **filters):
+                write(chunk)
+                rows += chunk.count(b'\n')
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {rows} {options['kind']} in {time.monotonic() - started:.1f}s"
+        ))
+
+    @contextmanager
+    def open_output(self, path):
+        """
+        A function writing bytes to the file `path` or, for '-', to the command's
+        stdout: its binary buffer when it has one, else (a StringIO passed to
+        call_command) as text.
+        """
+        if path != '-':
+            with open(path, 'wb') as output:
+                yield output.write
+            return
+        stream = self.stdout._out
+        buffer = getattr(stream, 'buffer', None)
+        if buffer is None:
+            yield lambda chunk: stream.write(chunk.decode())
+            return
+        stream.flush()
+        yield buffer.write
+        buffer.flush()
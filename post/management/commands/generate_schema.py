@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blogging.schema import generate_schema
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema of the API to OPENAPI_SCHEMA_PATH, where /swagger.json serves it from."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write to this file instead of OPENAPI_SCHEMA_PATH")
+        parser.add_argument('--check', action='store_true',
+                            help="Only fail if the file differs from the generated schema, e.g. in CI")
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.OPENAPI_SCHEMA_PATH
+        content = generate_schema()
+        if options['check']:
+            try:
+                with open(path, 'rb') as schema_file:
+                    current = schema_file.read()
+            except FileNotFoundError:
+                current = None
+            if current != content:
+                raise CommandError(f"{path} is out of date, run manage.py generate_schema")
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date"))
+            return
+
+        with open(path, 'wb') as schema_file:
+            schema_file.write(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote the schema ({len(content):,} bytes) to {path}"))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from post.importer import PostImporter
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Import posts and their comments from a JSONL file (one post per line, see post/importer.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL file to import, '-' to read standard input")
+        parser.add_argument('--author', help="Email of the author of rows that don't name one")
+        parser.add_argument('--batch-size', type=int, default=500, help="Posts per transaction")
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options['author']:
+            default_author = User.objects.filter(email=options['author']).first()
+            if default_author is None:
+                raise CommandError(f"Unknown author '{options['author']}'")
+
+        importer = PostImporter(default_author, batch_size=options['batch_size'])
+        if options['path'] == '-':
+            result = importer.run(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                result = importer.run(lines)
+
+        for line_number, errors in result.errors:
+            self.stderr.write(f"line {line_number}: {errors}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(f"... and {result.rejected - len(result.errors)} more rejected lines")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.posts} posts and {result.comments} comments in {result.elapsed:.1f}s "
+            f"({result.rows_per_second:,.0f} rows/s), rejected {result.rejected} lines"
+        ))
@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under `python -X importtime`, like a new worker process
+STARTUP = '''
+import io, json, sys, time
+started = time.perf_counter()
+timings = {}
+
+import django
+django.setup()
+timings['django.setup()'] = time.perf_counter() - started
+
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+timings['WSGI application'] = time.perf_counter() - started
+
+from django.urls import get_resolver
+get_resolver().urlconf_module
+timings['URLconf'] = time.perf_counter() - started
+
+from django.conf import settings
+path, watched = sys.argv[1], sys.argv[2:]
+host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+loaded_before = [name for name in watched if name in sys.modules]
+statuses = []
+
+def request():
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': host,
+               'SERVER_PORT': '80', 'HTTP_HOST': host, 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+               'wsgi.errors': sys.stderr}
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(body)
+    body.close()
+
+request()
+timings['first response'] = time.perf_counter() - started
+loaded = [name for name in watched if name in sys.modules and name not in loaded_before]
+before = time.perf_counter()
+request()
+print(json.dumps({'timings': timings, 'second_response': time.perf_counter() - before, 'status': statuses[0],
+                  'loaded_by_request': loaded, 'not_loaded': [name for name in watched if name not in sys.modules]}))
+'''
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# Modules only the documentation and the admin need
+WATCHED = ['drf_yasg.openapi', 'drf_yasg.generators', 'drf_yasg.views', 'blogging.docs_urls', 'blogging.admin_urls',
+           'post.admin', 'user.admin']
+
+
+class Command(BaseCommand):
+    help = ("Start the application in a new process and report where its cold start goes: "
+            "import time per module and the time to the first response. -X importtime adds some overhead.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/posts/', help="Path of the first request")
+        parser.add_argument('--top', type=int, default=25, help="Modules and packages to list")
+
+    def handle(self, *args, **options):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP, options['path'], *WATCHED],
+                                 cwd=settings.BASE_DIR, env=os.environ, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f"Startup failed:\n{process.stderr[-3000:]}")
+        report = json.loads(process.stdout.strip().splitlines()[-1])
+
+        modules, packages = [], defaultdict(int)
+        for line in process.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if match:
+                own, cumulative, name = int(match[1]), int(match[2]), match[4]
+                modules.append((cumulative, own, name))
+                packages[name.partition('.')[0]] += own
+
+        self.stdout.write(f"Startup of {os.environ.get('DJANGO_SETTINGS_MODULE')}, first request GET {options['path']}")
+        previous = 0
+        for step, seconds in report['timings'].items():
+            self.stdout.write(f"  {step:<20}{seconds * 1000:>9.1f} ms  (+{(seconds - previous) * 1000:.1f})")
+            previous = seconds
+        self.stdout.write(f"  {'second response':<20}{report['second_response'] * 1000:>9.1f} ms")
+        self.stdout.write(f"Response: {report['status']}")
+        self.stdout.write(f"Imported {len(modules)} modules, {sum(packages.values()) / 1000:.1f} ms in total")
+
+        self.stdout.write(f"\n{'package':<40}{'ms':>9}")
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"{name:<40}{own / 1000:>9.1f}")
+        self.stdout.write(f"\n{'module (with its imports)':<40}{'ms':>9}{'own ms':>9}")
+        for cumulative, own, name in sorted(modules, reverse=True)[:options['top']]:
+            self.stdout.write(f"{name:<40}{cumulative / 1000:>9.1f}{own / 1000:>9.1f}")
+
+        self.stdout.write(f"\nLoaded by the first request: {', '.join(report['loaded_by_request']) or 'none'}")
+        self.stdout.write(f"Not loaded: {', '.join(report['not_loaded']) or 'none'}")
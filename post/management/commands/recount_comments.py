@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from post.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.comment_count from the Comment table, one batch of posts per transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Posts per UPDATE")
+        parser.add_argument('--sleep', type=float, default=0, help="Seconds to pause between batches")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        counts = (Comment.objects.filter(post=OuterRef('pk'))
+                  .values('post').annotate(total=Count('id')).values('total'))
+        started = time.monotonic()
+        last_id, posts = 0, 0
+
+        while True:
+            ids = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            # Each UPDATE runs in its own short transaction, so only one batch of rows is locked at a time
+            Post.objects.filter(id__gte=ids[0], id__lte=ids[-1]).update(comment_count=Coalesce(Subquery(counts), 0))
+            last_id = ids[-1]
+            posts += len(ids)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Recounted comments of {posts} posts in {time.monotonic() - started:.1f}s"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from post.seeding import DataSeeder
+
+
+class Command(BaseCommand):
+    help = ("Generate synthetic users, posts and Zipf-distributed comments in bulk (COPY on PostgreSQL), "
+            "see post/seeding.py.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help="Exponent of the Zipf distributions of comments over posts and posts over authors")
+        parser.add_argument('--days', type=int, default=365, help="Posts are spread over this many past days")
+        parser.add_argument('--batch-size', type=int, default=50000, help="Rows per COPY or INSERT batch")
+        parser.add_argument('--password', default='password', help="Password of every generated user")
+        parser.add_argument('--seed', type=int, help="Random seed, for reproducible data")
+
+    def handle(self, *args, **options):
+        seeder = DataSeeder(
+            options['users'], options['posts'], options['comments'], zipf_exponent=options['zipf'],
+            days=options['days'], batch_size=options['batch_size'], password=options['password'],
+            seed=options['seed'], log=lambda message: self.stdout.write(f"Wrote {message}"),
+        )
+        try:
+            result = seeder.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {result.users} users, {result.posts} posts and {result.comments} comments "
+            f"in {result.elapsed:.1f}s ({result.rows_per_second:,.0f} rows/s)"
+        ))
@@ -0,0 +1,79 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest, TruncMinute
+
+from post.slugs import highest_number
+from post.trending import leaderboard
+
+
+class SlugSequenceManager(models.Manager):
+
+    def reserve(self, base, count=1):
+        """
+        Atomically reserve `count` consecutive numbers for `base` and return the
+        first one. An existing sequence costs a single UPDATE ... RETURNING.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET last = last + %s WHERE base = %s RETURNING last', [count, base]
+                )
+                row = cursor.fetchone()
+            if row:
+                return row[0] - count + 1
+
+            # First post for this base: start after any slugs that predate the sequence
+            from post.models import Post
+
+            slugs = Post.objects.filter(slug__startswith=base).values_list('slug', flat=True)
+            start = highest_number(base, slugs.iterator()) + 1
+            try:
+                with transaction.atomic():
+                    self.create(base=base, last=start + count - 1)
+                return start
+            except IntegrityError:
+                # Another writer created the sequence in the meantime
+                return self.reserve(base, count)
+
+
+def discount_comments(rows):
+    """
+    Take deleted comments, as [(post_id, when, comments)], off their posts'
+    comment_count (one UPDATE per distinct number of comments, not per post)
+    and off the trending leaderboards in one batch once the transaction commits.
+    """
+    from post.models import Post
+
+    per_post = defaultdict(int)
+    for post_id, _, comments in rows:
+        per_post[post_id] += comments
+    posts_by_count = defaultdict(list)
+    for post_id, comments in per_post.items():
+        posts_by_count[comments].append(post_id)
+    for comments, post_ids in posts_by_count.items():
+        Post.objects.filter(pk__in=post_ids).update(comment_count=Greatest(F('comment_count') - comments, 0))
+    if rows:
+        transaction.on_commit(partial(leaderboard.discard_many, rows))
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def discount(self):
+        """
+        Take these comments off the counts, before deleting them. One query
+        counts them per post and minute, the leaderboards' finest bucket.
+        """
+        rows = (self.order_by().values('post_id', minute=TruncMinute('timestamp'))
+                .annotate(comments=Count('id'))
+                .values_list('post_id', 'minute', 'comments'))
+        discount_comments(list(rows))
+
+    def delete(self):
+        # Comments deleted by a cascade don't come through here, see post/signals.py
+        with transaction.atomic(using=self.db):
+            self.discount()
+            return super().delete()
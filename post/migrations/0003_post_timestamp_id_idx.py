@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0002_comment_post_commen_post_id_e63791_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-timestamp', '-id'], name='post_post_timesta_43179f_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# The search document is a stored generated column, so PostgreSQL keeps it
+# current on every insert and update without any help from the ORM. Other
+# backends use the in-process index in post/search.py instead.
+CREATE_SEARCH_DOCUMENT = """
+ALTER TABLE post_post ADD COLUMN search_document tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'B')
+) STORED;
+CREATE INDEX post_post_search_document_idx ON post_post USING GIN (search_document);
+"""
+
+DROP_SEARCH_DOCUMENT = """
+DROP INDEX IF EXISTS post_post_search_document_idx;
+ALTER TABLE post_post DROP COLUMN IF EXISTS search_document;
+"""
+
+
+def create_search_document(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_DOCUMENT)
+
+
+def drop_search_document(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_DOCUMENT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0003_post_timestamp_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_document, drop_search_document),
+    ]
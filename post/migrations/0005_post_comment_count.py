@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Post = apps.get_model('post', 'Post')
+    Comment = apps.get_model('post', 'Comment')
+    counts = (Comment.objects.filter(post=OuterRef('pk'))
+              .values('post').annotate(total=Count('id')).values('total'))
+    Post.objects.using(schema_editor.connection.alias).update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0004_post_search_document'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-comment_count', '-timestamp'], name='post_post_comment_4e74e5_idx'),
+        ),
+    ]
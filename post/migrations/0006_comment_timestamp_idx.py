@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0005_post_comment_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['timestamp'], name='post_commen_timesta_a78e0a_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:06
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    Post = apps.get_model('post', 'Post')
+    Post.objects.using(schema_editor.connection.alias).update(updated_at=F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0006_comment_timestamp_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0007_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.SlugField(unique=True)),
+                ('last', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0009_post_updated_at_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Created before the post indexes it replaces are dropped
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-timestamp', '-id'], name='post_commen_post_id_8316c8_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='post_commen_post_id_e63791_idx',
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='post.post'),
+        ),
+    ]
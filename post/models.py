@@ -1,6 +1,12 @@
-from django.db import models
-from django.utils.text import slugify
+from collections import Counter
+
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
+from django.db.models.functions import RowNumber
+from post import search
+from post.cache import invalidate_post_detail
+from post.managers import CommentQuerySet, SlugSequenceManager, discount_comments
+from post.slugs import SLUG_MAX_LENGTH, base_slug, numbered_slug
 
 User = get_user_model()
 
@@ -8,41 +14,128 @@ class Post(models.Model):
     title = models.CharField(max_length=255)
     body = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
-    slug = models.SlugField(unique=True, blank=True)
+    slug = models.SlugField(max_length=SLUG_MAX_LENGTH, unique=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized, maintained by post/signals.py and the Comment deletes (see CommentQuerySet)
+    comment_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         indexes = [
             models.Index(fields=['slug']),  # Explicitly add an index for the slug field
-            models.Index(fields=['author'])
+            models.Index(fields=['author']),
+            models.Index(fields=['-timestamp', '-id']),  # Serves the feed ordering and cursor pagination
+            models.Index(fields=['-comment_count', '-timestamp']),  # Serves the top commented posts
+            models.Index(fields=['updated_at']),  # Exports of posts changed since a date
         ]
 
-    '''I have desided scenario from my side that multiple blog post can have same title,
-    If any will come like that i will add that timestamp to make slug unique.'''  
+    '''Multiple blog posts can have the same title. The first one gets the plain
+    slug, the next ones a number reserved from the SlugSequence of that slug.'''
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-        try:
-            super(Post, self).save(*args, **kwargs)
-        except Exception as e: 
-            self.slug = slugify(self.slug+str(self.timestamp)[:19])
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # comment_count is only written with F() updates (post/signals.py), an
+            # update must not put back the count this instance was loaded with
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'comment_count']
+        if self.slug:
             super(Post, self).save(*args, **kwargs)
+        else:
+            self._save_with_new_slug(*args, **kwargs)
+        search.index_post(self)
+        invalidate_post_detail(self.slug)
+
+    def _save_with_new_slug(self, *args, **kwargs):
+        base = base_slug(self.title)
+        for _ in range(10):
+            self.slug = numbered_slug(base, SlugSequence.objects.reserve(base))
+            try:
+                with transaction.atomic():
+                    super(Post, self).save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Only a slug taken outside the sequence (a truncated or legacy slug) is retried
+                if not Post.objects.filter(slug=self.slug).exists():
+                    self.slug = ''
+                    raise
+        self.slug = ''
+        raise IntegrityError(f"Could not allocate a unique slug for '{base}'")
+
+    @classmethod
+    def allocate_slugs(cls, titles):
+        """
+        Reserve unique slugs for a batch of titles, one sequence update per distinct base.
+        """
+        bases = [base_slug(title) for title in titles]
+        next_number = {base: SlugSequence.objects.reserve(base, count) for base, count in Counter(bases).items()}
+        slugs = []
+        for base in bases:
+            slugs.append(numbered_slug(base, next_number[base]))
+            next_number[base] += 1
+        return slugs
 
     def __str__(self):
         return self.title
 
 
+class SlugSequence(models.Model):
+    """
+    Last number handed out for posts whose title slugifies to `base`.
+    """
+    base = models.SlugField(max_length=SLUG_MAX_LENGTH, unique=True)
+    last = models.PositiveIntegerField(default=0)
+
+    objects = SlugSequenceManager()
+
+    def __str__(self):
+        return f"{self.base} ({self.last})"
+
+
 class Comment(models.Model):
     body = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
+    # Looked up through the (post, -timestamp, -id) index below, which starts with the post
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments', db_index=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         indexes = [
-            models.Index(fields=['post']),  # Explicitly add an index for the slug field
-            models.Index(fields=['author'])
+            # A post's comments in list order: pages are range scans of it, no sort
+            models.Index(fields=['post', '-timestamp', '-id']),
+            models.Index(fields=['author']),
+            models.Index(fields=['timestamp']),  # Rebuilding the trending leaderboards reads recent comments
         ]
 
+    @classmethod
+    def of_post(cls, slug):
+        """
+        Comments of the post with this slug, newest first. The slug is resolved
+        in a subquery of the same statement, so one query reads the comments
+        straight off the (post, -timestamp, -id) index.
+        """
+        post_id = models.Subquery(Post.objects.filter(slug=slug).values('id'))
+        return cls.objects.filter(post=post_id).order_by('-timestamp', '-id')
+
+    @classmethod
+    def latest_per_post(cls, post_ids, limit):
+        """
+        The `limit` newest comments of each of these posts, grouped by post,
+        in one query: ROW_NUMBER() ranks each post's comments, reading only
+        the (post, -timestamp, -id) index, and the rows of the top ranks are
+        fetched by id.
+        """
+        ranked = (cls.objects.filter(post_id__in=post_ids)
+                  .annotate(rank=models.Window(RowNumber(), partition_by=models.F('post_id'),
+                                               order_by=[models.F('timestamp').desc(), models.F('id').desc()]))
+                  .filter(rank__lte=limit)
+                  .values('id'))
+        return cls.objects.filter(id__in=ranked).order_by('post_id', '-timestamp', '-id')
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            discount_comments([(self.post_id, self.timestamp, 1)])
+            return super(Comment, self).delete(*args, **kwargs)
+
     def __str__(self):
         return f"Comment by {self.author.email} on {self.post.title}"
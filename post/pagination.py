@@ -0,0 +1,197 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over (timestamp, id), newest first.
+
+    There is no COUNT(*) and no OFFSET: each page is a range scan that starts
+    right after the last row of the previous one, so with an index on
+    (timestamp DESC, id DESC) page 10,000 costs the same as page 1.
+    The id breaks ties between rows created in the same microsecond.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    timestamp_field = 'timestamp'
+    id_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        return self.get_page(list(page_queryset))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Narrow the queryset down to one page (plus one row to detect more data).
+        Kept separate from `get_page` so the query can be evaluated by the caller.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+
+        ts, pk = self.timestamp_field, self.id_field
+        if self.cursor is not None:
+            lookup = 'gt' if self.reverse else 'lt'
+            position = self.cursor['timestamp']
+            queryset = queryset.filter(
+                Q(**{f'{ts}__{lookup}': position}) |
+                Q(**{ts: position, f'{pk}__{lookup}': self.cursor['id']})
+            )
+
+        if self.reverse:
+            queryset = queryset.order_by(ts, pk)
+        else:
+            queryset = queryset.order_by(f'-{ts}', f'-{pk}')
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = list(rows[:self.page_size])
+        if self.reverse:
+            rows.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        self.page = rows
+        return rows
+
+    def get_position(self, item):
+        return getattr(item, self.timestamp_field), getattr(item, self.id_field)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        timestamp, pk = self.get_position(self.page[-1])
+        return self.encode_cursor(timestamp, pk, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        timestamp, pk = self.get_position(self.page[0])
+        return self.encode_cursor(timestamp, pk, reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def decode_cursor(self, request):
+        # GET rather than query_params, which the plain Django requests of the async views don't have
+        encoded = request.GET.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            timestamp = parse_datetime(payload['t'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, OverflowError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return {'timestamp': timestamp, 'id': pk, 'reverse': reverse}
+
+    def encode_cursor(self, timestamp, pk, reverse):
+        payload = {'t': timestamp.isoformat(), 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+
+def wants_cursor_pagination(params):
+    return params.get('pagination') == 'cursor' or 'cursor' in params
+
+
+class CursorPaginationMixin:
+    """
+    Lets a GenericAPIView switch from `pagination_class` (page numbers) to
+    `cursor_pagination_class` with `?pagination=cursor` or a `cursor` param.
+    Page-number mode stays the default for existing clients.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor_pagination(self):
+        return wants_cursor_pagination(self.request.query_params)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination for plain Django async views: same pages, links and
+    errors, with the COUNT and the page rows fetched through the async ORM.
+    """
+
+    def get_page_number(self, request, paginator):
+        page_number = request.GET.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        return page_number
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Counted here so the Paginator never runs the query synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        return self.page.object_list
+
+    def get_paginated_data(self, data):
+        return {
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+
+class AsyncKeysetPagination(KeysetPagination):
+    """
+    KeysetPagination for plain Django async views: same pages, links and
+    errors, with the page rows fetched through the async ORM.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        page_queryset = self.get_page_queryset(queryset, request)
+        return self.get_page([row async for row in page_queryset])
+
+
+def async_paginator(request):
+    """
+    The paginator of an async list view: keyset pagination on the same
+    parameters as CursorPaginationMixin, page numbers otherwise.
+    """
+    if wants_cursor_pagination(request.GET):
+        return AsyncKeysetPagination()
+    return AsyncPageNumberPagination()
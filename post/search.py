@@ -0,0 +1,186 @@
+"""
+Full-text search over post titles and bodies.
+
+On PostgreSQL the `search_document` tsvector column (a stored generated column
+with a GIN index, see migration 0004) is maintained by the database on every
+insert and update. Other backends, SQLite test runs in particular, use an
+in-process inverted index that `Post.save` and a post_delete receiver keep up
+to date. Writes that bypass both are covered by checking the matches against
+the database, and the seeder resets the index.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.db import connection
+
+SEARCH_CONFIG = 'english'
+TITLE_WEIGHT = 2.0  # Mirrors the A/B weights of the tsvector column
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def uses_database_search():
+    return connection.vendor == 'postgresql'
+
+
+class InvertedIndex:
+    """
+    term -> {post_id: weighted term frequency}, with tf-idf ranking.
+    All query terms must match, like `websearch_to_tsquery` does by default.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}  # post_id -> terms, to remove a post in O(its terms)
+        self.lock = threading.Lock()
+
+    def add(self, post_id, title, body):
+        weights = Counter()
+        for term in tokenize(title):
+            weights[term] += TITLE_WEIGHT
+        for term in tokenize(body):
+            weights[term] += 1
+        with self.lock:
+            self._remove(post_id)
+            for term, weight in weights.items():
+                self.postings[term][post_id] = weight
+            self.documents[post_id] = tuple(weights)
+
+    def remove(self, post_id):
+        with self.lock:
+            self._remove(post_id)
+
+    def _remove(self, post_id):
+        for term in self.documents.pop(post_id, ()):
+            postings = self.postings[term]
+            postings.pop(post_id, None)
+            if not postings:
+                del self.postings[term]
+
+    def search(self, query):
+        """
+        Return [(post_id, score)] for posts containing every query term, best first.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self.lock:
+            postings = [self.postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            total = len(self.documents)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            scores = {post_id: 0.0 for post_id in candidates}
+            for term_postings in postings:
+                idf = math.log(1 + total / len(term_postings))
+                for post_id in candidates:
+                    scores[post_id] += (1 + math.log(term_postings[post_id])) * idf
+        # Newer posts (higher ids) win ties, same as the database ordering
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    The process-wide inverted index, built from the database on first use.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from post.models import Post
+
+                index = InvertedIndex()
+                for post_id, title, body in Post.objects.values_list('id', 'title', 'body').iterator(chunk_size=2000):
+                    index.add(post_id, title, body)
+                _index = index
+    return _index
+
+
+def index_post(post):
+    # An index that hasn't been built yet will pick the post up when it is
+    if _index is not None and not uses_database_search():
+        _index.add(post.pk, post.title, post.body)
+
+
+def unindex_post(post_id):
+    if _index is not None and not uses_database_search():
+        _index.remove(post_id)
+
+
+def reset_index():
+    """
+    Drop the in-process index, rebuilt on the next search. For bulk writes
+    that bypass `Post.save` (the seeder).
+    """
+    global _index
+    with _index_lock:
+        _index = None
+
+
+class RankedPosts:
+    """
+    Sequence of posts in rank order that only loads the slice being paginated.
+    The matches are checked against `queryset` once, in one query on their
+    ids, so posts the index still holds after a delete that bypassed it are
+    neither counted nor listed.
+    """
+
+    def __init__(self, ranked, queryset):
+        self.matches = ranked
+        self.queryset = queryset
+        self._ranked = None
+
+    @property
+    def ranked(self):
+        if self._ranked is None:
+            existing = set(self.queryset.filter(pk__in=[post_id for post_id, _ in self.matches])
+                           .values_list('pk', flat=True)) if self.matches else set()
+            self._ranked = [(post_id, score) for post_id, score in self.matches if post_id in existing]
+        return self._ranked
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def count(self):
+        return len(self.ranked)
+
+    def __getitem__(self, page_slice):
+        ranked = self.ranked[page_slice]
+        posts = self.queryset.in_bulk([post_id for post_id, _ in ranked])
+        page = []
+        for post_id, score in ranked:
+            # Deleted since the matches were checked
+            if post_id in posts:
+                posts[post_id].rank = score
+                page.append(posts[post_id])
+        return page
+
+
+def search_posts(query, queryset):
+    """
+    Posts of `queryset` matching `query`, best match first. Returns a queryset
+    on PostgreSQL and a `RankedPosts` sequence elsewhere; both can be paginated.
+    """
+    if not uses_database_search():
+        return RankedPosts(get_index().search(query), queryset)
+
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+    from django.db.models import F
+    from django.db.models.expressions import RawSQL
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return (queryset
+            .annotate(document=RawSQL('post_post.search_document', [], output_field=SearchVectorField()))
+            .filter(document=search_query)
+            .annotate(rank=SearchRank(F('document'), search_query))
+            .order_by('-rank', '-timestamp', '-id'))
@@ -0,0 +1,214 @@
+"""
+Synthetic data at production scale, for the seed_data command.
+
+Users, their author search trigrams, posts and comments are generated in
+memory and written in batches without going through `Model.save()`:
+
+- on PostgreSQL with `COPY ... FROM STDIN`, elsewhere with `executemany()`,
+  one transaction per batch;
+- every user shares one password hash, computed once;
+- post slugs are reserved per batch with `Post.allocate_slugs()`, so posts
+  created later through the API don't collide with them;
+- comments are spread over posts with a Zipf distribution (a few posts get
+  most of them). Their `comment_count` is known before the posts are
+  written, so no recount is needed.
+
+Users and posts get explicit ids above the current maximum so comments can
+reference them without reading them back. The id sequences are reset at the
+end. Run it on a database that isn't taking writes at the same time.
+"""
+import csv
+import io
+import random
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from post import search
+from post.models import Comment, Post
+from user.models import User, UserSearchTrigram
+from user.search import user_trigrams
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'Naresh', 'Priya', 'Wei', 'Fatima', 'Olga', 'Kenji', 'Amara', 'Lucas', 'Sofia', 'Mateo']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Sutha', 'Patel',
+              'Nguyen', 'Kim', 'Ivanova', 'Tanaka', 'Rossi', 'Okafor', 'Silva', 'Muller', 'Haddad', 'Cohen']
+WORDS = ['django', 'postgres', 'python', 'cache', 'latency', 'replica', 'index', 'queue', 'async', 'deploy',
+         'schema', 'query', 'release', 'review', 'testing', 'scaling', 'design', 'metrics', 'backup', 'search']
+TOPICS = ['Notes on', 'Lessons from', 'A guide to', 'Thoughts about', 'Debugging', 'Scaling', 'Tuning',
+          'Measuring', 'Rethinking', 'Shipping']
+
+
+class RowLoader:
+    """
+    Writes tuples of `fields` values (plain Python values, ids for foreign keys)
+    into the table of `model`.
+    """
+
+    def __init__(self, model, fields):
+        self.fields = [model._meta.get_field(name) for name in fields]
+        self.table = connection.ops.quote_name(model._meta.db_table)
+        self.columns = ', '.join(connection.ops.quote_name(field.column) for field in self.fields)
+        self.use_copy = connection.vendor == 'postgresql'
+
+    def load(self, rows):
+        with transaction.atomic():
+            if self.use_copy:
+                self.copy(rows)
+            else:
+                self.insert(rows)
+
+    def copy(self, rows):
+        # Strings are quoted and None is written unquoted, which COPY reads as NULL
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        buffer.seek(0)
+        sql = f'COPY {self.table} ({self.columns}) FROM STDIN WITH (FORMAT csv)'
+        with connection.cursor() as cursor:
+            if hasattr(cursor, 'copy_expert'):  # psycopg2
+                cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.copy(sql) as copy:  # psycopg 3
+                    copy.write(buffer.getvalue())
+
+    def insert(self, rows):
+        # Values are plain ints, strings and booleans apart from datetimes, which the backend formats itself
+        adapt = connection.ops.adapt_datetimefield_value
+        datetimes = [index for index, field in enumerate(self.fields) if isinstance(field, models.DateTimeField)]
+        rows = [list(row) for row in rows]
+        for row in rows:
+            for index in datetimes:
+                row[index] = adapt(row[index])
+        placeholders = ', '.join(['%s'] * len(self.fields))
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {self.table} ({self.columns}) VALUES ({placeholders})', rows)
+
+
+def zipf_cum_weights(size, exponent):
+    return list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+@dataclass
+class SeedResult:
+    users: int = 0
+    posts: int = 0
+    comments: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.users + self.posts + self.comments) / self.elapsed if self.elapsed else 0.0
+
+
+class DataSeeder:
+
+    def __init__(self, users, posts, comments, zipf_exponent=1.1, days=365, batch_size=50000,
+                 password='password', seed=None, log=None):
+        self.users = users
+        self.posts = posts
+        self.comments = comments
+        self.zipf_exponent = zipf_exponent
+        self.days = days
+        self.batch_size = batch_size
+        self.password = password
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+
+    def run(self):
+        started = time.monotonic()
+        if self.users < 1 or (self.comments and self.posts < 1):
+            raise ValueError("Posts need at least one user, comments at least one post")
+        first_user_id = (User.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        first_post_id = (Post.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+        self.seed_users(first_user_id)
+        self.log(f"{self.users} users")
+        # Which post each comment goes to is drawn first, so posts are written with their final comment_count
+        comment_posts = self.draw(self.posts, self.comments)
+        counts = array('l', [0]) * self.posts
+        for post_index in comment_posts:
+            counts[post_index] += 1
+        post_times = self.seed_posts(first_post_id, first_user_id, counts)
+        self.log(f"{self.posts} posts")
+        self.seed_comments(first_post_id, first_user_id, comment_posts, post_times)
+        self.log(f"{self.comments} comments")
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User, Post]):
+                cursor.execute(sql)
+        # The posts bypassed Post.save, an in-process search index would miss them
+        search.reset_index()
+        return SeedResult(self.users, self.posts, self.comments, time.monotonic() - started)
+
+    def draw(self, population, count):
+        """
+        `count` indexes in range(population), Zipf distributed over a shuffled ranking.
+        """
+        if not count:
+            return array('l')
+        ranking = list(range(population))
+        self.rng.shuffle(ranking)
+        cum_weights = zipf_cum_weights(population, self.zipf_exponent)
+        drawn = array('l')
+        for start in range(0, count, self.batch_size):
+            drawn.extend(self.rng.choices(ranking, cum_weights=cum_weights, k=min(self.batch_size, count - start)))
+        return drawn
+
+    def seed_users(self, first_id):
+        encoded = make_password(self.password)
+        users = RowLoader(User, ['id', 'email', 'first_name', 'last_name', 'password', 'is_superuser',
+                                 'is_staff', 'is_active', 'date_joined'])
+        trigrams = RowLoader(UserSearchTrigram, ['user', 'trigram'])
+        for start in range(0, self.users, self.batch_size):
+            rows = []
+            for user_id in range(first_id + start, first_id + min(start + self.batch_size, self.users)):
+                first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                rows.append((user_id, f'{first}.{last}.{user_id}@example.com'.lower(), first, last, encoded,
+                             False, False, True, self.now))
+            users.load(rows)
+            trigrams.load([(row[0], gram) for row in rows
+                           for gram in user_trigrams({'email': row[1], 'first_name': row[2], 'last_name': row[3]})])
+
+    def seed_posts(self, first_id, first_user_id, counts):
+        bodies = [' '.join(self.rng.choices(WORDS, k=self.rng.randint(20, 120))).capitalize() + '.'
+                  for _ in range(1000)]
+        # Authors are Zipf distributed too: a few prolific writers, a long tail of occasional ones
+        authors = self.draw(self.users, self.posts)
+        span = self.days * 86400
+        post_times = array('d')
+        posts = RowLoader(Post, ['id', 'title', 'body', 'author', 'slug', 'timestamp', 'updated_at',
+                                 'comment_count'])
+        for start in range(0, self.posts, self.batch_size):
+            end = min(start + self.batch_size, self.posts)
+            titles = [f'{self.rng.choice(TOPICS)} {self.rng.choice(WORDS)}' for _ in range(start, end)]
+            rows = []
+            for index, title, slug in zip(range(start, end), titles, Post.allocate_slugs(titles)):
+                offset = self.rng.random() * span
+                post_times.append(offset)
+                timestamp = self.now - timedelta(seconds=offset)
+                rows.append((first_id + index, title, self.rng.choice(bodies), first_user_id + authors[index], slug,
+                             timestamp, timestamp, counts[index]))
+            posts.load(rows)
+        return post_times
+
+    def seed_comments(self, first_post_id, first_user_id, comment_posts, post_times):
+        bodies = [' '.join(self.rng.choices(WORDS, k=self.rng.randint(5, 30))).capitalize() + '.'
+                  for _ in range(1000)]
+        comments = RowLoader(Comment, ['body', 'author', 'post', 'timestamp'])
+        for start in range(0, self.comments, self.batch_size):
+            rows = []
+            for post_index in comment_posts[start:start + self.batch_size]:
+                # Some time between the post and now
+                age = post_times[post_index] * self.rng.random()
+                rows.append((self.rng.choice(bodies), first_user_id + self.rng.randrange(self.users),
+                             first_post_id + post_index, self.now - timedelta(seconds=age)))
+            comments.load(rows)
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from blogging.fast_serializers import FastSerializer
+from blogging.metrics import TimedSerializerMixin
 from post.models import Post, Comment
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.email')
     slug = serializers.ReadOnlyField()  # Make slug read-only
 
@@ -22,7 +24,14 @@ class PostSerializer(serializers.ModelSerializer):
         return value
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class PostSearchSerializer(PostSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['rank']
+
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.email')
     post = serializers.ReadOnlyField(source='post.title')
 
@@ -38,7 +47,19 @@ class CommentSerializer(serializers.ModelSerializer):
         return value
 
 
-class TopCommentPostSerializer(serializers.ModelSerializer):
+class PostExportSerializer(PostSerializer):
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['updated_at', 'comment_count']
+
+
+class CommentExportSerializer(CommentSerializer):
+    post_id = serializers.ReadOnlyField()
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['post_id']
+
+
+class TopCommentPostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.email')
     post = serializers.ReadOnlyField(source='post.title')
     comment_count = serializers.CharField() 
@@ -46,3 +67,34 @@ class TopCommentPostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['id', 'body', 'author', 'post', 'comment_count', 'timestamp']
+
+
+# Comments embedded in their post by the post list with include=comment_preview
+class CommentPreviewSerializer(CommentSerializer):
+    class Meta(CommentSerializer.Meta):
+        fields = ['id', 'body', 'author', 'timestamp']
+
+
+# Read-only fast paths of the serializers above for the list endpoints
+post_fast_serializer = FastSerializer(PostSerializer)
+comment_fast_serializer = FastSerializer(CommentSerializer)
+comment_preview_fast_serializer = FastSerializer(CommentPreviewSerializer)
+top_comment_post_fast_serializer = FastSerializer(TopCommentPostSerializer, model=Post)
+post_export_fast_serializer = FastSerializer(PostExportSerializer)
+comment_export_fast_serializer = FastSerializer(CommentExportSerializer)
+
+
+def serialize_post_previews(rows, comments):
+    """
+    The post list payload of `rows` (post rows with comment_count) for
+    include=comment_preview: each post with its `comment_count` and its
+    `latest_comments`, taken from `comments` (preview rows with post_id).
+    """
+    previews = {}
+    for comment in comments:
+        previews.setdefault(comment.post_id, []).append(comment)
+    posts = post_fast_serializer.serialize(rows)
+    for post, row in zip(posts, rows):
+        post['comment_count'] = row.comment_count
+        post['latest_comments'] = comment_preview_fast_serializer.serialize(previews.get(row.id, []))
+    return posts
@@ -0,0 +1,50 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from post import search
+from post.cache import invalidate_post_details
+from post.models import Comment, Post
+from post.trending import leaderboard
+from user.models import User
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(comment_count=F('comment_count') + 1)
+        transaction.on_commit(partial(leaderboard.record, instance.post_id, instance.timestamp))
+
+
+# Deleting a comment or a queryset of comments updates the counts itself (see
+# Comment.delete and CommentQuerySet). There is no delete receiver on Comment,
+# so the comments of a deleted post or user go in a single DELETE each; the
+# receivers below account for them.
+
+@receiver(pre_delete, sender=User)
+def discount_comments_of_user(sender, instance, **kwargs):
+    # Comments on the user's own posts go with the posts
+    Comment.objects.filter(author=instance).exclude(post__author=instance).discount()
+
+
+@receiver(post_delete, sender=Post)
+def forget_trending_post(sender, instance, **kwargs):
+    transaction.on_commit(partial(leaderboard.forget, [instance.pk]))
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    # Also runs for the posts of a deleted user, which Post.delete never sees
+    transaction.on_commit(partial(search.unindex_post, instance.pk))
+    transaction.on_commit(partial(invalidate_post_details, [instance.slug]))
+
+
+@receiver(post_save, sender=User)
+def invalidate_posts_of_author(sender, instance, created, update_fields=None, **kwargs):
+    # The cached detail payload shows the author's email. Logins only save last_login.
+    if created or (update_fields is not None and 'email' not in update_fields):
+        return
+    invalidate_post_details(Post.objects.filter(author=instance).values_list('slug', flat=True))
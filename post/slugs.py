@@ -0,0 +1,42 @@
+"""
+Slug helpers for `Post`.
+
+The first post with a given title gets the plain slug ("my-title"), the next
+ones a number from a per-base sequence ("my-title-2", "my-title-3", ...), see
+`SlugSequence`. Numbers are reserved atomically, so concurrent writers never
+pick the same slug and a batch of posts can reserve all its numbers at once.
+"""
+import re
+
+from django.utils.text import slugify
+
+SLUG_MAX_LENGTH = 50
+DEFAULT_BASE = 'post'
+
+
+def base_slug(title):
+    return slugify(title)[:SLUG_MAX_LENGTH].strip('-') or DEFAULT_BASE
+
+
+def numbered_slug(base, number):
+    if number <= 1:
+        return base
+    suffix = f'-{number}'
+    return base[:SLUG_MAX_LENGTH - len(suffix)].rstrip('-') + suffix
+
+
+def highest_number(base, slugs):
+    """
+    Highest sequence number already used by `slugs` for `base`, 0 if none.
+    Used once per base, to start its sequence after posts that predate it.
+    """
+    pattern = re.compile(r'-(\d+)$')
+    highest = 0
+    for slug in slugs:
+        if slug == base:
+            highest = max(highest, 1)
+            continue
+        match = pattern.search(slug)
+        if match and numbered_slug(base, int(match.group(1))) == slug:
+            highest = max(highest, int(match.group(1)))
+    return highest
@@ -1,9 +1,41 @@
 import unittest
-from django.test import Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, models, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, Client, RequestFactory, override_settings
+from django.utils.http import urlencode
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from post.models import Post, Comment
+from post.cache import get_post_detail
+from post.models import Post, Comment, SlugSequence
+from post.serializers import (PostSerializer, CommentSerializer, TopCommentPostSerializer,
+                              post_fast_serializer, comment_fast_serializer, top_comment_post_fast_serializer)
+from post.trending import TrendingLeaderboard
+from blogging.metrics import registry as metrics_registry
+from blogging.renderers import ORJSONParser, ORJSONRenderer
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from blogging.routers import ReplicaPinMiddleware, ReplicaRouter, use_primary
+from blogging.schema import generate_schema, schema_file
+from blogging.lazy import LazyURLResolver, openapi as lazy_openapi, resolve as resolve_deferred
+from django.urls import Resolver404, resolve, reverse
+from django.conf import settings
+from rest_framework_simplejwt.tokens import AccessToken
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
+import asyncio
+import base64
+import collections
+import decimal
+import gzip
+import io
+import uuid
+import os
+import tempfile
 import json
+import threading
 
 User = get_user_model()
 
@@ -170,3 +202,1128 @@ class TopCommentedPostsTestCase(unittest.TestCase):
         User.objects.all().delete()
         Post.objects.all().delete()
         Comment.objects.all().delete()
+
+
+class PostCursorPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.email = 'testuser@gmail.com'
+        self.password = 'testpassword'
+        # Create a test user
+        self.user = User.objects.create_user(email=self.email, first_name='Cursor', last_name='Tester')
+        self.user.set_password(self.password)
+        self.user.save()
+        self.other_user = User.objects.create_user(email='other@gmail.com', first_name='Other', last_name='Writer')
+
+        self.login_url = '/login/'
+        self.post_list_url = '/posts/'
+
+        # Authenticate and get JWT token
+        response = self.client.post(self.login_url, {
+            'email': self.email,
+            'password': self.password
+        }, content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        # 25 posts by the test user and 5 by someone else
+        for i in range(25):
+            Post.objects.create(title=f'Cursor post {i}', body='This is a test post.', author=self.user)
+        for i in range(5):
+            Post.objects.create(title=f'Other post {i}', body='This is a test post.', author=self.other_user)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_cursor_pages_walk_the_whole_feed(self):
+        expected = list(Post.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+        seen = []
+        page = self.get(self.post_list_url, {'pagination': 'cursor'})
+        self.assertIsNone(page['previous'])
+        self.assertNotIn('count', page)
+        while True:
+            seen.extend(post['id'] for post in page['results'])
+            if not page['next']:
+                break
+            page = self.get(page['next'])
+        self.assertEqual(seen, expected)
+
+        # Walk back from the last page using the previous links
+        back = []
+        while page['previous']:
+            page = self.get(page['previous'])
+            back = [post['id'] for post in page['results']] + back
+        self.assertEqual(back, expected[:len(back)])
+        self.assertEqual(len(back), 20)
+
+    def test_cursor_pagination_with_author_filter(self):
+        page = self.get(self.post_list_url, {'pagination': 'cursor', 'author': 'writer'})
+        self.assertEqual(len(page['results']), 5)
+        self.assertIsNone(page['next'])
+        self.assertTrue(all(post['author'] == 'other@gmail.com' for post in page['results']))
+
+    def test_invalid_cursor(self):
+        # The id of the last one overflows int(): 1e999 is parsed as infinity
+        overflowing = base64.urlsafe_b64encode(b'{"t":"2024-01-01T00:00:00+00:00","i":1e999}').decode()
+        for cursor in ['not-a-cursor', overflowing]:
+            for url in [self.post_list_url, f'/async{self.post_list_url}']:
+                response = self.client.get(url, {'cursor': cursor}, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                self.assertEqual(json.loads(response.content)['detail'], 'Invalid cursor')
+
+    def test_page_number_mode_still_default(self):
+        page = self.get(self.post_list_url)
+        self.assertEqual(page['count'], 30)
+        self.assertEqual(len(page['results']), 10)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+
+
+class CommentCursorPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        self.post = Post.objects.create(title='Commented post', body='This is a test post.', author=self.user)
+        self.other_post = Post.objects.create(title='Other post', body='This is a test post.', author=self.user)
+        for i in range(23):
+            Comment.objects.create(post=self.post, author=self.user, body=f'Comment {i}')
+            Comment.objects.create(post=self.other_post, author=self.user, body=f'Other comment {i}')
+        # Comments written in the same microsecond are ordered by id
+        Comment.objects.filter(post=self.post, body__in=['Comment 3', 'Comment 4', 'Comment 5']).update(
+            timestamp=timezone.now() - timedelta(days=1))
+        self.url = f'/posts/{self.post.slug}/comments/'
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_cursor_pages_walk_all_comments(self):
+        expected = list(self.post.comments.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+        seen = []
+        page = self.get(self.url, {'pagination': 'cursor'})
+        self.assertIsNone(page['previous'])
+        self.assertNotIn('count', page)
+        while True:
+            self.assertEqual(page['results']['msg'], "Retrieved comments successfully")
+            seen.extend(comment['id'] for comment in page['results']['data'])
+            if not page['next']:
+                break
+            page = self.get(page['next'])
+        self.assertEqual(seen, expected)
+
+        back = []
+        while page['previous']:
+            page = self.get(page['previous'])
+            back = [comment['id'] for comment in page['results']['data']] + back
+        self.assertEqual(back, expected[:20])
+
+    def test_page_number_mode_still_default(self):
+        page = self.get(self.url, {'page': 3})
+        self.assertEqual(page['count'], 23)
+        self.assertEqual(len(page['results']['data']), 3)
+        self.assertTrue(all(comment['post'] == 'Commented post' for comment in page['results']['data']))
+
+    def test_missing_post_and_post_without_comments(self):
+        for params in ({}, {'page': 2}, {'pagination': 'cursor'}):
+            response = self.client.get('/posts/missing-post/comments/', params,
+                                       HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        empty = Post.objects.create(title='Quiet post', body='This is a test post.', author=self.user)
+        self.assertEqual(self.get(f'/posts/{empty.slug}/comments/', {'pagination': 'cursor'})['results']['data'], [])
+        response = self.client.get(self.url, {'page': 9}, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def tearDown(self):
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class PostCommentPreviewTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        self.posts = {}
+        for count in (5, 0, 2):
+            post = Post.objects.create(title=f'Post with {count} comments', body='This is a test post.',
+                                       author=self.user)
+            for i in range(count):
+                Comment.objects.create(post=post, author=self.user, body=f'Comment {i} of post {post.id}')
+            self.posts[post.id] = post
+
+    def get(self, params):
+        response = self.client.get('/posts/', params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_latest_comments_embedded(self):
+        page = self.get({'include': 'comment_preview'})
+        self.assertEqual(len(page['results']), 3)
+        for result in page['results']:
+            post = self.posts[result['id']]
+            latest = post.comments.order_by('-timestamp', '-id')[:3]
+            self.assertEqual(result['comment_count'], post.comments.count())
+            self.assertEqual(result['latest_comments'], [
+                {'id': comment.id, 'body': comment.body, 'author': 'testuser@gmail.com',
+                 'timestamp': CommentSerializer(comment).data['timestamp']} for comment in latest
+            ])
+        self.assertEqual([len(result['latest_comments']) for result in page['results']], [2, 0, 3])
+
+        cursor_page = self.get({'include': 'comment_preview', 'pagination': 'cursor'})
+        self.assertEqual(cursor_page['results'], page['results'])
+
+    def test_without_include(self):
+        result = self.get({})['results'][0]
+        self.assertNotIn('latest_comments', result)
+        self.assertNotIn('comment_count', result)
+
+    def test_unknown_include(self):
+        response = self.client.get('/posts/', {'include': 'comment_preview,everything'},
+                                   HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_one_query_for_all_previews(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get({'include': 'comment_preview', 'pagination': 'cursor'})
+        self.assertEqual(len(queries), 2)  # posts, comments
+
+    def tearDown(self):
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class PostSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.email = 'testuser@gmail.com'
+        self.password = 'testpassword'
+        # Create a test user
+        self.user = User.objects.create_user(email=self.email)
+        self.user.set_password(self.password)
+        self.user.save()
+
+        self.login_url = '/login/'
+        self.search_url = '/posts/search/'
+
+        # Authenticate and get JWT token
+        response = self.client.post(self.login_url, {
+            'email': self.email,
+            'password': self.password
+        }, content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        self.django_post = Post.objects.create(title='Django tips', body='Making django queries fast with indexes.', author=self.user)
+        self.python_post = Post.objects.create(title='Python tricks', body='A few words about django and python.', author=self.user)
+        self.other_post = Post.objects.create(title='Gardening', body='Tomatoes need plenty of sun.', author=self.user)
+
+    def search(self, query):
+        response = self.client.get(self.search_url, {'q': query}, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in json.loads(response.content)['results']]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search('django'), [self.django_post.id, self.python_post.id])
+        self.assertEqual(self.search('python django'), [self.python_post.id])
+        self.assertEqual(self.search('nothing here'), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.other_post.body = 'Growing tomatoes while learning django.'
+        self.other_post.save()
+        self.assertIn(self.other_post.id, self.search('django'))
+
+        self.django_post.delete()
+        self.assertNotIn(self.django_post.id, self.search('django'))
+
+    def test_posts_deleted_behind_the_index_are_not_counted(self):
+        self.search('django')  # Builds the index
+        # A delete without signals, like a bulk write would do
+        Post.objects.filter(pk=self.django_post.pk)._raw_delete(connection.alias)
+        response = self.client.get(self.search_url, {'q': 'django'}, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        page = json.loads(response.content)
+        self.assertEqual(page['count'], 1)
+        self.assertEqual([post['id'] for post in page['results']], [self.python_post.id])
+
+    def test_search_requires_terms(self):
+        response = self.client.get(self.search_url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+
+
+class CommentCountTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.email = 'testuser@gmail.com'
+        self.password = 'testpassword'
+        # Create a test user
+        self.user = User.objects.create_user(email=self.email)
+        self.user.set_password(self.password)
+        self.user.save()
+        self.commenter = User.objects.create_user(email='commenter@gmail.com')
+
+        # Authenticate and get JWT token
+        response = self.client.post('/login/', {
+            'email': self.email,
+            'password': self.password
+        }, content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        self.post = Post.objects.create(title='Counted post', body='This is a test post.', author=self.user)
+
+    def comment_count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_count_follows_comment_creation_and_cascade(self):
+        response = self.client.post(f'/posts/{self.post.slug}/comments/', {'body': 'First comment'},
+                                    HTTP_AUTHORIZATION=f'Bearer {self.token}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Comment.objects.create(post=self.post, author=self.commenter, body='Second comment')
+        Comment.objects.create(post=self.post, author=self.commenter, body='Third comment')
+        self.assertEqual(self.comment_count(), 3)
+
+        # Deleting a user removes their comments through a cascade
+        self.commenter.delete()
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_count_follows_comment_deletes(self):
+        comments = [Comment.objects.create(post=self.post, author=self.commenter, body=f'Comment {i}')
+                    for i in range(4)]
+        comments[0].delete()
+        self.assertEqual(self.comment_count(), 3)
+        Comment.objects.filter(pk__in=[comments[1].pk, comments[2].pk]).delete()
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_saving_a_stale_post_keeps_the_count(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        for i in range(3):
+            Comment.objects.create(post=self.post, author=self.commenter, body=f'Comment {i}')
+        stale.title = 'Renamed post'
+        stale.save()
+        self.assertEqual(self.comment_count(), 3)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, 'Renamed post')
+
+        response = self.client.put(f'/posts/{self.post.slug}/', {'body': 'Updated body.'},
+                                   HTTP_AUTHORIZATION=f'Bearer {self.token}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.comment_count(), 3)
+
+    def test_post_delete_removes_comments_in_one_query(self):
+        for i in range(20):
+            Comment.objects.create(post=self.post, author=self.commenter, body=f'Comment {i}')
+        with CaptureQueriesContext(connection) as queries:
+            self.post.delete()
+        deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 2)  # The comments, then the post
+        self.assertFalse(Comment.objects.filter(author=self.commenter).exists())
+
+    def test_recount_command_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.commenter, body='Only comment')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=42)
+
+        call_command('recount_comments', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(self.comment_count(), 1)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class TrendingLeaderboardTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.leaderboard = TrendingLeaderboard()
+        self.leaderboard.synced_at = float('inf')  # Don't rebuild from the database
+
+    def top(self, window, limit=5, now=None):
+        return self.leaderboard.top(window, limit, now=now or self.now)
+
+    def test_windows_count_recent_comments(self):
+        for _ in range(3):
+            self.leaderboard.record(1, self.now - timedelta(minutes=5), now=self.now)
+        for _ in range(2):
+            self.leaderboard.record(2, self.now - timedelta(hours=5), now=self.now)
+        self.leaderboard.record(3, self.now - timedelta(days=3), now=self.now)
+
+        self.assertEqual(self.top('hour'), [(1, 3)])
+        self.assertEqual(self.top('day'), [(1, 3), (2, 2)])
+        self.assertEqual(self.top('week'), [(1, 3), (2, 2), (3, 1)])
+        self.assertEqual(self.top('week', limit=2), [(1, 3), (2, 2)])
+
+    def test_old_buckets_expire(self):
+        self.leaderboard.record(1, self.now, now=self.now)
+        self.leaderboard.record(2, self.now, now=self.now)
+        self.leaderboard.record(2, self.now, now=self.now)
+        self.leaderboard.discard(2, self.now, now=self.now)
+        # Same count: the newer post (higher id) comes first
+        self.assertEqual(self.top('hour'), [(2, 1), (1, 1)])
+        self.assertEqual(self.top('hour', now=self.now + timedelta(hours=2)), [])
+        self.assertEqual(self.top('day', now=self.now + timedelta(hours=2)), [(2, 1), (1, 1)])
+
+    def test_batched_deletes(self):
+        for post_id, comments in [(1, 3), (2, 2), (3, 1)]:
+            for _ in range(comments):
+                self.leaderboard.record(post_id, self.now, now=self.now)
+        self.leaderboard.discard_many([(1, self.now, 2), (3, self.now, 1)], now=self.now)
+        self.assertEqual(self.top('hour'), [(2, 2), (1, 1)])
+        self.leaderboard.forget([2])
+        self.assertEqual(self.top('hour'), [(1, 1)])
+        self.assertEqual(self.top('hour', now=self.now + timedelta(hours=2)), [])
+
+    def test_one_rebuild_at_a_time(self):
+        self.leaderboard.record(1, self.now, now=self.now)
+        self.leaderboard.synced_at = 0  # Stale
+        rebuilds = []
+        self.leaderboard.rebuild = lambda: rebuilds.append(1)
+        # Another request is rebuilding: this one answers from the previous counts
+        with self.leaderboard.rebuild_lock:
+            self.assertEqual(self.top('hour'), [(1, 1)])
+        self.assertEqual(rebuilds, [])
+        # A stale board is recounted in the background, the request doesn't wait for it
+        rebuilt = threading.Event()
+        self.leaderboard.rebuild = lambda: (rebuilt.wait(5), rebuilds.append(1))
+        self.assertEqual(self.top('hour'), [(1, 1)])
+        rebuilt.set()
+        self.leaderboard.rebuild_thread.join()
+        self.assertEqual(rebuilds, [1])
+        self.assertFalse(self.leaderboard.rebuild_lock.locked())
+
+    def test_changes_during_a_rebuild_are_replayed(self):
+        empty_counters = self.leaderboard._empty_counters
+
+        def counters_while_counting():
+            # Comments arrive while the rebuild's query runs, after its cutoff
+            self.leaderboard.record(1, timezone.now())
+            self.leaderboard.record(2, timezone.now())
+            self.leaderboard.forget([2])
+            return empty_counters()
+
+        self.leaderboard._empty_counters = counters_while_counting
+        self.leaderboard.rebuild()
+        self.assertEqual(self.top('hour', now=timezone.now()), [(1, 1)])
+        self.assertIsNone(self.leaderboard.changes)
+
+
+class TopCommentedPostsWindowTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.email = 'testuser@gmail.com'
+        self.password = 'testpassword'
+        # Create a test user
+        self.user = User.objects.create_user(email=self.email)
+        self.user.set_password(self.password)
+        self.user.save()
+
+        # Authenticate and get JWT token
+        response = self.client.post('/login/', {
+            'email': self.email,
+            'password': self.password
+        }, content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        self.quiet_post = Post.objects.create(title='Quiet post', body='This is a test post.', author=self.user)
+        self.busy_post = Post.objects.create(title='Busy post', body='This is a test post.', author=self.user)
+        Comment.objects.create(post=self.quiet_post, author=self.user, body='Only comment')
+        for i in range(3):
+            Comment.objects.create(post=self.busy_post, author=self.user, body=f'Comment {i}')
+
+    def get(self, params):
+        return self.client.get('/top-five-posts/', params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_window_and_limit(self):
+        response = self.get({'window': 'hour', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)['data']
+        self.assertEqual([(post['id'], post['comment_count']) for post in data], [(self.busy_post.id, '3')])
+
+    def test_invalid_window_or_limit(self):
+        self.assertEqual(self.get({'window': 'year'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get({'limit': 1000}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class PostDetailCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.email = 'testuser@gmail.com'
+        self.password = 'testpassword'
+        # Create a test user
+        self.user = User.objects.create_user(email=self.email)
+        self.user.set_password(self.password)
+        self.user.save()
+
+        # Authenticate and get JWT token
+        response = self.client.post('/login/', {
+            'email': self.email,
+            'password': self.password
+        }, content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        self.post = Post.objects.create(title='Cached post', body='This is a test post.', author=self.user)
+        self.url = f'/posts/{self.post.slug}/'
+
+    def get(self, **headers):
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {self.token}', **headers)
+
+    def test_cache_hit_and_conditional_get_skip_the_post_query(self):
+        first = self.get()
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get()
+            not_modified = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+        self.assertFalse([query for query in queries.captured_queries if 'post_post' in query['sql']])
+
+    def test_update_invalidates_the_cached_payload(self):
+        first = self.get()
+        response = self.client.put(self.url, {'body': 'This body was updated.'},
+                                   HTTP_AUTHORIZATION=f'Bearer {self.token}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        second = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(second.content)['data']['body'], 'This body was updated.')
+
+        self.post.delete()
+        self.assertEqual(self.get().status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_author_changes_invalidate_the_cached_payload(self):
+        first = self.get()
+        self.user.email = 'renamed@gmail.com'
+        self.user.save()
+        self.assertIsNone(get_post_detail(self.post.slug))
+        # The post's updated_at didn't move: a revalidation by date alone must not get a 304
+        for url in [self.url, f'/async{self.url}']:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {self.token}',
+                                       HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(response.content)['data']['author'], 'renamed@gmail.com')
+
+        self.get()
+        self.user.delete()
+        self.assertIsNone(get_post_detail(self.post.slug))
+        self.assertEqual(self.get().status_code, status.HTTP_404_NOT_FOUND)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+
+
+class QueryBudgetTestCase(unittest.TestCase):
+    """
+    Serializing a page must not cost a query per row (author.email, post.title).
+    """
+    budgets = {
+        # Reads authenticate from the token claims alone, without a user query
+        '/posts/': 2,  # count, page
+        '/posts/?pagination=cursor': 1,  # page
+        '/posts/?author=writer': 2,
+        '/posts/?include=comment_preview': 3,  # count, page, comments of the page
+        '/posts/?pagination=cursor&include=comment_preview': 2,  # page, comments of the page
+        '/posts/search/?q=budget': 3,  # index build, ids of the matches, page
+        '/posts/budget-post-0/': 1,  # post
+        '/posts/budget-post-0/comments/': 2,  # count, page (the post is resolved in both)
+        '/posts/budget-post-0/comments/?pagination=cursor': 1,  # page
+        '/top-five-posts/': 1,  # posts
+        '/top-five-posts/?window=day': 2,  # leaderboard rebuild, posts
+    }
+
+    def setUp(self):
+        self.client = Client()
+        self.email = 'testuser@gmail.com'
+        self.password = 'testpassword'
+        # Create a test user
+        self.user = User.objects.create_user(email=self.email)
+        self.user.set_password(self.password)
+        self.user.save()
+
+        # Authenticate and get JWT token
+        response = self.client.post('/login/', {
+            'email': self.email,
+            'password': self.password
+        }, content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+        # Every post and comment has its own author, so a query per row would show up
+        first_post = None
+        for i in range(12):
+            author = User.objects.create_user(email=f'writer{i}@gmail.com', first_name='Writer')
+            post = Post.objects.create(title=f'Budget post {i}', body='This is a test post.', author=author)
+            first_post = first_post or post
+            Comment.objects.create(post=first_post, author=author, body=f'Comment {i}')
+
+    def test_query_budget_per_endpoint(self):
+        for url, budget in self.budgets.items():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertLessEqual(len(queries), budget, url)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class FastSerializerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.other_user = User.objects.create_user(email='other@gmail.com')
+        for i in range(3):
+            post = Post.objects.create(title=f'Fast post {i}', body='Unicode body \u2603 with "quotes".', author=self.user)
+            for j in range(i):
+                Comment.objects.create(post=post, author=self.other_user, body=f'Comment {j} on post {i}')
+
+    def assertSameOutput(self, serializer_class, fast_serializer, queryset):
+        expected = serializer_class(queryset, many=True).data
+        self.assertEqual(json.dumps(fast_serializer.serialize(fast_serializer.values(queryset))), json.dumps(expected))
+
+    def test_fast_path_matches_drf_serializers(self):
+        posts = Post.objects.order_by('-timestamp', '-id')
+        self.assertSameOutput(PostSerializer, post_fast_serializer, posts)
+        self.assertSameOutput(CommentSerializer, comment_fast_serializer, Comment.objects.order_by('-timestamp'))
+        self.assertSameOutput(TopCommentPostSerializer, top_comment_post_fast_serializer,
+                              Post.objects.order_by('-comment_count', '-timestamp'))
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class SlugAllocationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+
+    def test_same_title_gets_numbered_slugs(self):
+        slugs = [Post.objects.create(title='Same Title', body='Body', author=self.user).slug for _ in range(3)]
+        self.assertEqual(slugs, ['same-title', 'same-title-2', 'same-title-3'])
+
+    def test_sequence_starts_after_existing_slugs(self):
+        Post.objects.create(title='Legacy', body='Body', author=self.user, slug='legacy-post')
+        Post.objects.create(title='Legacy', body='Body', author=self.user, slug='legacy-post-7')
+        post = Post.objects.create(title='Legacy Post', body='Body', author=self.user)
+        self.assertEqual(post.slug, 'legacy-post-8')
+
+    def test_long_and_empty_titles(self):
+        long_post = Post.objects.create(title='word ' * 40, body='Body', author=self.user)
+        long_copy = Post.objects.create(title='word ' * 40, body='Body', author=self.user)
+        self.assertLessEqual(len(long_copy.slug), 50)
+        self.assertNotEqual(long_post.slug, long_copy.slug)
+        self.assertEqual(Post.objects.create(title='!!!', body='Body', author=self.user).slug, 'post')
+
+    def test_allocate_slugs_reserves_per_base(self):
+        Post.objects.create(title='Batch', body='Body', author=self.user)
+        self.assertEqual(Post.allocate_slugs(['Batch', 'Other', 'Batch']), ['batch-2', 'other', 'batch-3'])
+
+    def test_concurrent_creates_get_unique_slugs(self):
+        threads, per_thread, errors = 8, 5, []
+
+        def create_posts():
+            try:
+                for _ in range(per_thread):
+                    Post.objects.create(title='Concurrent Title', body='Body', author=self.user)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=create_posts) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        slugs = list(Post.objects.filter(title='Concurrent Title').values_list('slug', flat=True))
+        self.assertEqual(len(slugs), threads * per_thread)
+        self.assertEqual(len(set(slugs)), threads * per_thread)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        SlugSequence.objects.all().delete()
+
+
+class BulkImportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        self.reader = User.objects.create_user(email='reader@gmail.com')
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+        self.lines = [
+            json.dumps({'title': 'Imported post', 'body': 'Imported body text.',
+                        'comments': [{'body': 'First comment', 'author': 'reader@gmail.com'},
+                                     {'body': 'Second comment'}]}),
+            json.dumps({'title': 'T', 'body': 'Too short a title.'}),
+            '{not json',
+            json.dumps({'title': 'Imported post', 'body': 'Same title, other body.'}),
+        ]
+
+    def test_bulk_endpoint_imports_valid_lines(self):
+        response = self.client.post('/posts/bulk/', '\n'.join(self.lines).encode(),
+                                    HTTP_AUTHORIZATION=f'Bearer {self.token}', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)['data']
+        self.assertEqual((data['posts'], data['comments'], data['rejected']), (2, 2, 2))
+        self.assertEqual([error['line'] for error in data['errors']], [2, 3])
+
+        posts = Post.objects.filter(title='Imported post').order_by('id')
+        self.assertEqual([post.slug for post in posts], ['imported-post', 'imported-post-2'])
+        self.assertEqual([post.comment_count for post in posts], [2, 0])
+        # The endpoint imports everything as the requesting user
+        self.assertEqual(set(Comment.objects.values_list('author__email', flat=True)), {'testuser@gmail.com'})
+
+    def test_bulk_endpoint_requires_authentication(self):
+        response = self.client.post('/posts/bulk/', self.lines[0].encode(), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(Post.objects.exists())
+
+    def test_import_command_resolves_authors(self):
+        out, err = io.StringIO(), io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.jsonl')
+            with open(path, 'w') as f:
+                f.write('\n'.join(self.lines + [json.dumps({'title': 'Nobody wrote', 'body': 'Unknown author here.',
+                                                             'author': 'nobody@gmail.com'})]))
+            call_command('import_posts', path, author='testuser@gmail.com', batch_size=2, stdout=out, stderr=err)
+        self.assertIn('Imported 2 posts and 2 comments', out.getvalue())
+        self.assertIn('rejected 3 lines', out.getvalue())
+        self.assertIn("Unknown author 'nobody@gmail.com'", err.getvalue())
+        self.assertEqual(Comment.objects.get(body='First comment').author, self.reader)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        SlugSequence.objects.all().delete()
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+        self.posts = [Post.objects.create(title=f'Exported post {i}', body='Exported body \u2028 text.', author=self.user)
+                      for i in range(3)]
+        for post in self.posts[:2]:
+            Comment.objects.create(post=post, author=self.user, body=f'Comment on {post.title}')
+
+    def export(self, url):
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_export_posts_streams_every_post_in_id_order(self):
+        rows = self.export('/export/posts/')
+        self.assertEqual([row['id'] for row in rows], [post.id for post in self.posts])
+        self.assertEqual(rows[0]['body'], 'Exported body \u2028 text.')
+        self.assertEqual([row['comment_count'] for row in rows], [1, 1, 0])
+
+        rows = self.export(f'/export/posts/?min_id={self.posts[1].id}&max_id={self.posts[1].id}')
+        self.assertEqual([row['slug'] for row in rows], [self.posts[1].slug])
+
+    def test_export_comments_and_filters(self):
+        rows = self.export('/export/comments/')
+        self.assertEqual([row['post_id'] for row in rows], [self.posts[0].id, self.posts[1].id])
+        since = (timezone.now() + timedelta(minutes=1)).isoformat()
+        self.assertEqual(self.export(f'/export/comments/?{urlencode({"updated_since": since})}'), [])
+
+        response = self.client.get('/export/posts/?updated_since=yesterday', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command_writes_ndjson(self):
+        err = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson')
+            call_command('export_data', 'posts', output=path, chunk_size=2, stderr=err)
+            with open(path) as f:
+                self.assertEqual([json.loads(line)['id'] for line in f], [post.id for post in self.posts])
+        self.assertIn('Exported 3 posts', err.getvalue())
+
+    def test_export_command_writes_to_its_stdout(self):
+        out = io.StringIO()
+        call_command('export_data', 'posts', chunk_size=2, stdout=out, stderr=io.StringIO())
+        self.assertEqual([json.loads(line)['id'] for line in out.getvalue().splitlines()],
+                         [post.id for post in self.posts])
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class AsyncViewsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+        for i in range(12):
+            post = Post.objects.create(title=f'Async post {i}', body='This is a test post.', author=self.user)
+            Comment.objects.create(post=post, author=self.user, body=f'Comment on post {i}')
+        self.post = post
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_async_views_match_sync_views(self):
+        cursor = json.loads(self.get('/posts/?pagination=cursor').content)['next'].partition('?')[2]
+        for url in ['/posts/', '/posts/?page=2', '/posts/?author=testuser', f'/posts/{self.post.slug}/',
+                    '/posts/?pagination=cursor', f'/posts/?{cursor}', '/posts/?include=comment_preview',
+                    '/posts/?pagination=cursor&include=comment_preview', '/posts/?include=unknown',
+                    f'/posts/{self.post.slug}/comments/', f'/posts/{self.post.slug}/comments/?pagination=cursor',
+                    '/posts/missing-slug/comments/?pagination=cursor',
+                    '/top-five-posts/', '/top-five-posts/?window=day&limit=3']:
+            cache.clear()
+            expected, response = self.get(url), self.get(f'/async{url}')
+            self.assertEqual(response.status_code, expected.status_code, url)
+            # Page links differ by the /async prefix only
+            self.assertEqual(response.content.decode().replace('/async/', '/'), expected.content.decode(), url)
+
+    def test_async_errors(self):
+        self.assertEqual(self.client.get('/async/posts/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get('/async/posts/?page=99').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get('/async/posts/missing-slug/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get('/async/top-five-posts/?window=year').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_comment_create(self):
+        async def create():
+            return await AsyncClient().post(f'/async/posts/{self.post.slug}/comments/', {'body': 'Async comment'},
+                                            content_type='application/json',
+                                            headers={'Authorization': f'Bearer {self.token}'})
+
+        response = asyncio.run(create())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content)['data']['author'], 'testuser@gmail.com')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        replicas = override_settings(DATABASE_REPLICAS=['replica'])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.other_user = User.objects.create_user(email='otheruser@gmail.com')
+        cache.clear()
+
+    def read_alias(self, request):
+        return self.router.db_for_read(Post)
+
+    def headers(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_router(self):
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        middleware = ReplicaPinMiddleware(self.read_alias)
+        self.assertEqual(middleware(self.factory.get('/posts/', **self.headers(self.user))), 'replica')
+        self.assertEqual(middleware(self.factory.post('/posts/', **self.headers(self.user))), 'default')
+        self.assertEqual(middleware(self.factory.get('/posts/', **self.headers(self.user))), 'default')
+        # Other users and anonymous requests still read from the replica
+        self.assertEqual(middleware(self.factory.get('/posts/', **self.headers(self.other_user))), 'replica')
+        self.assertEqual(middleware(self.factory.get('/posts/')), 'replica')
+        self.assertEqual(middleware(self.factory.get('/posts/', HTTP_AUTHORIZATION='Bearer invalid')), 'replica')
+        # More than two parts: get_raw_token raises AuthenticationFailed
+        self.assertEqual(middleware(self.factory.get('/posts/', HTTP_AUTHORIZATION='Bearer a b')), 'replica')
+        self.assertEqual(middleware(self.factory.post('/posts/', HTTP_AUTHORIZATION='Bearer a b')), 'default')
+
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            middleware(self.factory.delete('/posts/slug/', **self.headers(self.other_user)))
+        self.assertEqual(middleware(self.factory.get('/posts/', **self.headers(self.other_user))), 'replica')
+
+    def test_async_middleware(self):
+        async def read_alias(request):
+            return self.router.db_for_read(Post)
+
+        middleware = ReplicaPinMiddleware(read_alias)
+
+        async def requests():
+            return [await middleware(self.factory.get('/posts/', **self.headers(self.user))),
+                    await middleware(self.factory.put('/posts/slug/', **self.headers(self.user))),
+                    await middleware(self.factory.get('/posts/', **self.headers(self.user)))]
+
+        self.assertEqual(asyncio.run(requests()), ['replica', 'default', 'default'])
+
+    def tearDown(self):
+        cache.clear()
+        User.objects.all().delete()
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+        for i in range(3):
+            Post.objects.create(title=f'Metrics post {i}', body='This is a test post.', author=self.user)
+        metrics_registry.clear()
+
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {self.token}', **extra)
+
+    def metric(self, body, name, labels):
+        prefix = f'{name}{{{labels}}} '
+        values = [line[len(prefix):] for line in body.splitlines() if line.startswith(prefix)]
+        self.assertEqual(len(values), 1, prefix)
+        return float(values[0])
+
+    def test_request_metrics(self):
+        sizes = [len(self.get('/posts/').content) for _ in range(2)]
+        export = b''.join(self.get('/export/posts/').streaming_content)
+        self.get('/posts/missing-slug/')
+
+        body = self.client.get('/metrics').content.decode()
+        labels = 'route="get_create_post",method="GET",status="200"'
+        self.assertEqual(self.metric(body, 'blogging_http_request_duration_seconds_count', labels), 2)
+        self.assertEqual(self.metric(body, 'blogging_http_request_duration_seconds_bucket', labels + ',le="+Inf"'), 2)
+        # Two queries per page (count and rows), the user comes from the token
+        self.assertEqual(self.metric(body, 'blogging_http_request_sql_queries_sum', labels), 4)
+        self.assertGreater(self.metric(body, 'blogging_http_request_sql_seconds_total', labels), 0)
+        self.assertGreater(self.metric(body, 'blogging_http_request_serializer_seconds_total', labels), 0)
+        self.assertEqual(self.metric(body, 'blogging_http_response_bytes_total', labels), sum(sizes))
+        self.assertEqual(self.metric(body, 'blogging_http_response_bytes_total',
+                                     'route="export_posts",method="GET",status="200"'), len(export))
+        self.assertEqual(self.metric(body, 'blogging_http_request_duration_seconds_count',
+                                     'route="post_detail",method="GET",status="404"'), 1)
+        self.assertIn('blogging_password_hashing_completed_total ', body)
+
+    def test_metrics_token(self):
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def tearDown(self):
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+
+
+class SeedDataTestCase(unittest.TestCase):
+    def test_seed_data(self):
+        output = io.StringIO()
+        call_command('seed_data', users=5, posts=40, comments=300, batch_size=16, seed=7, password='seed-password',
+                     stdout=output)
+        self.assertIn('Seeded 5 users, 40 posts and 300 comments', output.getvalue())
+        self.assertEqual((User.objects.count(), Post.objects.count(), Comment.objects.count()), (5, 40, 300))
+
+        posts = list(Post.objects.annotate(total=models.Count('comments')))
+        self.assertTrue(all(post.comment_count == post.total for post in posts))
+        # Zipf: the busiest post gets far more than an even share
+        self.assertGreater(max(post.comment_count for post in posts), 300 / 40 * 3)
+        self.assertEqual(len({post.slug for post in posts}), 40)
+        self.assertTrue(all(comment.timestamp >= comment.post.timestamp
+                            for comment in Comment.objects.select_related('post')))
+
+        # Generated rows work like any other: search, login, new posts get fresh slugs and ids
+        user = User.objects.order_by('id').first()
+        self.assertIn(user, User.objects.search(user.last_name))
+        response = Client().post('/login/', {'email': user.email, 'password': 'seed-password'},
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        post = Post.objects.create(title=posts[0].title, body='A post written after seeding.', author=user)
+        self.assertNotIn(post.slug, {seeded.slug for seeded in posts})
+        self.assertGreater(post.id, max(seeded.id for seeded in posts))
+
+    def tearDown(self):
+        User.objects.all().delete()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        SlugSequence.objects.all().delete()
+
+
+class RendererTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='testuser@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'testuser@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.token = json.loads(response.content)["data"].get('access')
+
+    def test_same_bytes_as_drf(self):
+        Row = collections.namedtuple('Row', 'id title')
+        moment = datetime(2024, 5, 17, 10, 30, 1, 123456, tzinfo=dt_timezone.utc)
+        payloads = [
+            {'status': 200, 'msg': 'ok', 'data': {'title': 'Line and paragraph \x00\x1f é 😀 "\\/'}},
+            {'moment': moment, 'plain': moment.replace(tzinfo=None), 'offset': moment.astimezone(
+                dt_timezone(timedelta(hours=5, minutes=30))), 'day': moment.date(), 'time': moment.time()},
+            {'decimal': decimal.Decimal('1.25'), 'uuid': uuid.UUID(int=7), 'lazy': gettext_lazy('Invalid input.'),
+             'row': Row(1, 'first'), 1: [None, True, 0.5, -0.0], 'big': 2 ** 70, 'duration': timedelta(seconds=90)},
+            PostSerializer(Post(id=3, title='Serialized post', body='Body text', author=self.user, slug='slug',
+                                timestamp=moment)).data,
+        ]
+        for payload in payloads:
+            self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(ORJSONRenderer().render(payloads[0], 'application/json; indent=4'),
+                         JSONRenderer().render(payloads[0], 'application/json; indent=4'))
+
+    def test_parser(self):
+        parse = ORJSONParser().parse
+        self.assertEqual(parse(io.BytesIO('{"body": "é", "n": [1, 2.5, null]}'.encode())),
+                         {'body': 'é', 'n': [1, 2.5, None]})
+        self.assertEqual(parse(io.BytesIO(b'{"big": 123456789012345678901234567890}')),
+                         {'big': 123456789012345678901234567890})
+        with self.assertRaises(ParseError):
+            parse(io.BytesIO(b'{"body": '))
+
+    def test_gzip_threshold(self):
+        for i in range(10):
+            Post.objects.create(title=f'Compressed post {i}', body='A long enough body. ' * 20, author=self.user)
+        plain = self.client.get('/posts/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = self.client.get('/posts/', HTTP_AUTHORIZATION=f'Bearer {self.token}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertNotIn('Content-Encoding', plain)
+
+        # Below the threshold the body is sent as is
+        response = self.client.get('/posts/missing/', HTTP_AUTHORIZATION=f'Bearer {self.token}',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        export = self.client.get('/export/posts/', HTTP_AUTHORIZATION=f'Bearer {self.token}',
+                                 HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(export['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(export.streaming_content)).splitlines()), 10)
+
+    def tearDown(self):
+        User.objects.all().delete()
+        Post.objects.all().delete()
+
+
+class SchemaTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        schema_file.clear()
+
+    def test_schema_file_up_to_date(self):
+        # Fails when a view or serializer changed the API: run `manage.py generate_schema` and commit the file
+        with open(settings.OPENAPI_SCHEMA_PATH, 'rb') as committed:
+            self.assertEqual(committed.read(), generate_schema(),
+                             f"{settings.OPENAPI_SCHEMA_PATH} is out of date, run manage.py generate_schema")
+
+    def test_served_with_etag(self):
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with open(settings.OPENAPI_SCHEMA_PATH, 'rb') as committed:
+            self.assertEqual(response.content, committed.read())
+        self.assertIn('/posts/{slug}/comments/', json.loads(response.content)['paths'])
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ui_pages_load_the_schema_file(self):
+        for url in ('/swagger/', '/redoc/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b'/swagger.json', response.content)
+
+    def tearDown(self):
+        schema_file.clear()
+
+
+class LazyLoadingTestCase(unittest.TestCase):
+    def test_lazy_include(self):
+        resolver = LazyURLResolver('blogging.missing_urls', prefixes=['missing/'])
+        with self.assertRaises(Resolver404):
+            resolver.resolve('posts/')  # Would fail with ImportError if the module was imported
+        self.assertEqual(resolve('/swagger.json').url_name, 'schema-json')
+        self.assertEqual(reverse('schema-swagger-ui'), '/swagger/')
+        self.assertEqual(reverse('admin:index'), '/admin/')
+
+    def test_deferred_openapi(self):
+        from drf_yasg import openapi as drf_openapi
+
+        parameter = lazy_openapi.Parameter('q', lazy_openapi.IN_QUERY, type=lazy_openapi.TYPE_STRING)
+        self.assertEqual(resolve_deferred({'parameters': [parameter]}),
+                         {'parameters': [drf_openapi.Parameter('q', 'query', type='string')]})
+
+    def test_profile_startup(self):
+        out = io.StringIO()
+        call_command('profile_startup', path='/metrics', top=5, stdout=out)
+        output = out.getvalue()
+        self.assertIn('first response', output)
+        self.assertIn('Response: 200 OK', output)
+        self.assertIn('Loaded by the first request: none', output)
+        self.assertIn('drf_yasg.generators', output.split('Not loaded: ')[1])
@@ -0,0 +1,236 @@
+"""
+Time-windowed "most commented" leaderboards (last hour, day and week).
+
+Each window keeps comment counts per post in time buckets plus a ranking
+sorted by (count desc, post id desc) in a `SortedList`. A new comment updates
+one bucket and moves one entry in the ranking in O(log n), reading the top k
+is a slice. Expired buckets are subtracted lazily, so the window edge is only
+as precise as the bucket size.
+
+The leaderboard lives in process memory. It is rebuilt from the Comment table
+on first use (cold start) and again every `TRENDING_RESYNC_SECONDS`, which
+also picks up comments written by other worker processes. The database counts
+the comments per post and minute, and each ranking is sorted once. One thread
+rebuilds at a time: on a cold start the others wait for its result, later the
+rebuild runs on a background thread while requests keep serving the previous
+counts. Comments recorded during a rebuild are replayed on its result.
+"""
+import threading
+import time
+from bisect import insort
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+from sortedcontainers import SortedList
+
+# window name -> (window length, bucket length)
+WINDOWS = {
+    'hour': (timedelta(hours=1), timedelta(minutes=1)),
+    'day': (timedelta(days=1), timedelta(minutes=15)),
+    'week': (timedelta(days=7), timedelta(hours=2)),
+}
+
+
+class WindowCounter:
+    """
+    Comment counts per post over a sliding window, split in fixed buckets.
+    """
+
+    def __init__(self, length, bucket):
+        self.bucket_seconds = bucket.total_seconds()
+        self.bucket_count = int(length / bucket)
+        self.buckets = {}  # bucket number -> Counter(post_id -> comments)
+        self.bucket_keys = []  # sorted bucket numbers, oldest first
+        self.scores = {}
+        self.ranking = SortedList()  # (-count, -post_id)
+
+    def _bucket(self, when):
+        return int(when.timestamp() // self.bucket_seconds)
+
+    def _set_score(self, post_id, count):
+        old = self.scores.get(post_id, 0)
+        if old:
+            self.ranking.remove((-old, -post_id))
+        if count > 0:
+            self.scores[post_id] = count
+            self.ranking.add((-count, -post_id))
+        else:
+            self.scores.pop(post_id, None)
+
+    def load(self, buckets, now):
+        """
+        Replace the counts with `buckets` ({bucket number: Counter(post_id -> comments)}),
+        summing them up and sorting the ranking once.
+        """
+        oldest = self._bucket(now) - self.bucket_count + 1
+        self.buckets = {key: counts for key, counts in buckets.items() if key >= oldest}
+        self.bucket_keys = sorted(self.buckets)
+        self.scores = Counter()
+        for counts in self.buckets.values():
+            self.scores.update(counts)
+        self.scores = {post_id: count for post_id, count in self.scores.items() if count > 0}
+        self.ranking = SortedList((-count, -post_id) for post_id, count in self.scores.items())
+
+    def expire(self, now):
+        oldest = self._bucket(now) - self.bucket_count + 1
+        while self.bucket_keys and self.bucket_keys[0] < oldest:
+            for post_id, count in self.buckets.pop(self.bucket_keys.pop(0)).items():
+                self._set_score(post_id, self.scores.get(post_id, 0) - count)
+
+    def add(self, post_id, when, now, delta=1):
+        self.expire(now)
+        key = self._bucket(when)
+        if key < self._bucket(now) - self.bucket_count + 1:
+            return
+        if key not in self.buckets:
+            self.buckets[key] = Counter()
+            insort(self.bucket_keys, key)
+        bucket = self.buckets[key]
+        if bucket[post_id] + delta < 0:
+            return
+        bucket[post_id] += delta
+        self._set_score(post_id, self.scores.get(post_id, 0) + delta)
+
+    def remove(self, post_id):
+        for counts in self.buckets.values():
+            counts.pop(post_id, None)
+        self._set_score(post_id, 0)
+
+    def top(self, limit, now):
+        self.expire(now)
+        return [(-post_id, -count) for count, post_id in self.ranking.islice(0, limit)]
+
+
+class TrendingLeaderboard:
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = windows
+        self.counters = self._empty_counters()
+        self.synced_at = None
+        self.lock = threading.Lock()
+        self.rebuild_lock = threading.Lock()
+        self.rebuild_thread = None
+        # While a rebuild runs: the changes to replay on its counts, and the
+        # time its query counts up to
+        self.changes = None
+        self.cutoff = None
+
+    def _empty_counters(self):
+        return {name: WindowCounter(length, bucket) for name, (length, bucket) in self.windows.items()}
+
+    def _apply(self, change, now, when=None):
+        """
+        Apply `change(counters, now)` to the counts, and keep it for the counts
+        being rebuilt unless it is a comment from before the rebuild's cutoff,
+        which its query already counts. Deletes are always kept.
+        """
+        with self.lock:
+            change(self.counters, now)
+            if self.changes is not None and (when is None or when >= self.cutoff):
+                self.changes.append(change)
+
+    def record(self, post_id, when, delta=1, now=None):
+        def change(counters, now):
+            for counter in counters.values():
+                counter.add(post_id, when, now, delta)
+
+        self._apply(change, now or timezone.now(), when if delta > 0 else None)
+
+    def discard(self, post_id, when, now=None):
+        self.record(post_id, when, delta=-1, now=now)
+
+    def discard_many(self, rows, now=None):
+        """
+        Take [(post_id, when, comments)] off the counts at once.
+        """
+        def change(counters, now):
+            for counter in counters.values():
+                for post_id, when, comments in rows:
+                    counter.add(post_id, when, now, -comments)
+
+        self._apply(change, now or timezone.now())
+
+    def forget(self, post_ids):
+        """
+        Drop deleted posts from every window.
+        """
+        def change(counters, now):
+            for counter in counters.values():
+                for post_id in post_ids:
+                    counter.remove(post_id)
+
+        self._apply(change, timezone.now())
+
+    def top(self, window, limit, now=None):
+        """
+        Return [(post_id, comments in window)] for the `limit` most commented posts.
+        """
+        if self.synced_at is None:
+            # Nothing to serve yet: one thread counts, the others wait for its counts
+            with self.rebuild_lock:
+                if self.synced_at is None:
+                    self.rebuild()
+        elif self.stale() and self.rebuild_lock.acquire(blocking=False):
+            # Stale: recounted on a thread of its own, requests answer from the current counts meanwhile
+            self.rebuild_thread = threading.Thread(target=self._rebuild_in_background, daemon=True,
+                                                   name='trending-rebuild')
+            self.rebuild_thread.start()
+        now = now or timezone.now()
+        with self.lock:
+            return self.counters[window].top(limit, now)
+
+    def stale(self):
+        return time.monotonic() - self.synced_at > getattr(settings, 'TRENDING_RESYNC_SECONDS', 300)
+
+    def _rebuild_in_background(self):
+        try:
+            if self.stale():
+                self.rebuild()
+        finally:
+            # The connection of this thread would stay open otherwise
+            connections.close_all()
+            self.rebuild_lock.release()
+
+    def rebuild(self):
+        """
+        Recount every window from the comments of the longest one. Changes
+        made while the query runs are replayed on the new counts.
+        """
+        from post.models import Comment
+
+        now = timezone.now()
+        with self.lock:
+            self.changes, self.cutoff = [], now
+        try:
+            since = now - max(length for length, _ in self.windows.values())
+            counters = self._empty_counters()
+            # Every bucket size is a whole number of minutes, so per minute counts add up to any of them
+            rows = (Comment.objects.filter(timestamp__gte=since, timestamp__lt=now).order_by()
+                    .values('post_id', minute=TruncMinute('timestamp'))
+                    .annotate(comments=Count('id'))
+                    .values_list('post_id', 'minute', 'comments'))
+            buckets = {name: defaultdict(Counter) for name in counters}
+            sizes = [(buckets[name], counter.bucket_seconds) for name, counter in counters.items()]
+            for post_id, minute, comments in rows.iterator(chunk_size=5000):
+                seconds = minute.timestamp()
+                for window_buckets, bucket_seconds in sizes:
+                    window_buckets[int(seconds // bucket_seconds)][post_id] += comments
+            for name, counter in counters.items():
+                counter.load(buckets[name], now)
+            with self.lock:
+                replayed_at = timezone.now()
+                for change in self.changes:
+                    change(counters, replayed_at)
+                self.counters = counters
+                self.synced_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.changes = self.cutoff = None
+
+
+leaderboard = TrendingLeaderboard()
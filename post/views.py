@@ -1,47 +1,79 @@
 from rest_framework.generics import GenericAPIView
-from django.db.models import Q, Count
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from blogging.lazy import no_body, openapi, swagger_auto_schema
 
-from post.models import Post
-from post.serializers import (PostSerializer, CommentSerializer,
-                            TopCommentPostSerializer)
+from post.cache import cache_post_detail, get_post_detail
+from post.exporter import export_ndjson, parse_filters
+from post.importer import PostImporter
+from post.models import Comment, Post
+from post.pagination import CursorPaginationMixin
+from post.search import search_posts
+from post.trending import WINDOWS, leaderboard
+from user.models import User
+from post.serializers import (PostSerializer, PostSearchSerializer, CommentSerializer,
+                            post_fast_serializer, comment_fast_serializer,
+                            top_comment_post_fast_serializer, comment_preview_fast_serializer,
+                            serialize_post_previews)
+from blogging.querysets import shape_queryset
+from blogging.routers import use_primary
 from blogging.utils import get_response
 
 
-class PostListCreateAPIView(GenericAPIView):
+class PostListCreateAPIView(CursorPaginationMixin, GenericAPIView):
     """
     List all posts with pagination, and create a new post.
     """
     permission_classes = [IsAuthenticated]
+    # Reads return public data, a user built from the token claims is enough (see user/authentication.py)
+    token_user_for_safe_methods = True
     pagination_class = PageNumberPagination  # Enable pagination for this view
+    includes = {'comment_preview'}
 
     @swagger_auto_schema(
-        operation_description="Get the list of posts with pagination",
+        operation_description="Get the list of posts with pagination. Pass `pagination=cursor` "
+                              "to get keyset pagination with opaque next/previous cursors instead of page numbers.",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to `cursor` for cursor pagination", type=openapi.TYPE_STRING, enum=['cursor']),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from the `next`/`previous` link", type=openapi.TYPE_STRING),
             openapi.Parameter('author', openapi.IN_QUERY, description="Filter posts by author (Firstname, Lastname or email)", type=openapi.TYPE_STRING),
+            openapi.Parameter('include', openapi.IN_QUERY, description="`comment_preview` adds `comment_count` and the newest comments (`latest_comments`) to each post", type=openapi.TYPE_STRING, enum=['comment_preview']),
             ],
-        responses={200: openapi.Response("Paginated list of posts", PostSerializer(many=True))},
+        responses={
+            200: openapi.Response("Paginated list of posts", PostSerializer(many=True)),
+            400: openapi.Response(description="Unknown include", examples={"application/json": {"status": 400, "msg": "Unknown include", "data": {}}}),
+        },
     )
     def get(self, request):
-        print(dir(request),)
         authot_filter = request.query_params.get("author")
-        # List order by timestamps
-        post_queryset = Post.objects.all().order_by('-timestamp') 
+        includes = set(filter(None, request.query_params.get("include", "").split(",")))
+        if includes - self.includes:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Unknown include", {})
+
+        # List order by timestamps (id breaks ties, cursor pagination relies on it)
+        post_queryset = Post.objects.all().order_by('-timestamp', '-id')
         if authot_filter:
-            post_queryset = post_queryset.filter(
-                Q(author__first_name__icontains=authot_filter) |
-                Q(author__last_name__icontains=authot_filter) |
-                Q(author__email__icontains=authot_filter)
-            )
-
-        posts = self.paginate_queryset(post_queryset)
-        serializer = PostSerializer(posts, many=True)
-        return self.get_paginated_response(serializer.data)
+            # Resolve matching authors through the trigram index before touching posts
+            post_queryset = post_queryset.filter(author__in=User.objects.search(authot_filter).values('id'))
+
+        if 'comment_preview' not in includes:
+            # Same output as PostSerializer, built from plain rows
+            posts = self.paginate_queryset(post_fast_serializer.values(post_queryset))
+            return self.get_paginated_response(post_fast_serializer.serialize(posts))
+
+        rows = self.paginate_queryset(post_fast_serializer.values(post_queryset, 'comment_count'))
+        # The newest comments of every post of the page in one query, never one per post
+        comments = Comment.latest_per_post([row.id for row in rows], settings.COMMENT_PREVIEW_SIZE)
+        comments = comment_preview_fast_serializer.values(comments, 'post_id')
+        return self.get_paginated_response(serialize_post_previews(rows, comments))
 
     @swagger_auto_schema(
         operation_description="Create a new post",
@@ -59,25 +91,100 @@ class PostListCreateAPIView(GenericAPIView):
         return get_response(status.HTTP_400_BAD_REQUEST, "Invalid data", serializer.errors)
 
 
+class PostSearchAPIView(GenericAPIView):
+    """
+    Full-text search over post titles and bodies, best match first.
+    """
+    permission_classes = [IsAuthenticated]
+    token_user_for_safe_methods = True
+    pagination_class = PageNumberPagination
+
+    @swagger_auto_schema(
+        operation_description="Search posts by title and body, ranked by relevance, with pagination",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Search terms", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response("Paginated list of matching posts", PostSearchSerializer(many=True)),
+            400: openapi.Response(description="Missing search terms", examples={
+                "application/json": {"status": 400, "msg": "Search terms are required", "data": {}}
+            }),
+        },
+    )
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Search terms are required", {})
+
+        posts = self.paginate_queryset(search_posts(query, shape_queryset(Post.objects.all(), PostSerializer)))
+        serializer = PostSearchSerializer(posts, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PostBulkImportAPIView(GenericAPIView):
+    """
+    Import posts with their comments from a JSONL request body, as the requesting user.
+    """
+    permission_classes = [IsAuthenticated]
+    batch_size = 500
+
+    @swagger_auto_schema(
+        operation_description="Import posts from a JSONL body (`application/x-ndjson`), one post per line: "
+                              "`{\"title\": ..., \"body\": ..., \"comments\": [{\"body\": ...}]}`. "
+                              "The body is read line by line and written in batches; invalid lines are "
+                              "reported and skipped. Posts and comments are authored by the requesting user.",
+        request_body=no_body,
+        consumes=['application/x-ndjson'],
+        responses={
+            200: openapi.Response(description="Import finished", examples={"application/json": {
+                "status": 200, "msg": "Import finished",
+                "data": {"posts": 2, "comments": 3, "rejected": 1, "errors": [{"line": 2, "errors": {}}], "seconds": 0.1},
+            }}),
+        },
+    )
+    def post(self, request):
+        # request.data is never touched: the body is streamed instead of parsed at once
+        lines = request.stream if request.stream is not None else []
+        result = PostImporter(request.user, batch_size=self.batch_size, use_row_authors=False).run(lines)
+        return get_response(status.HTTP_200_OK, "Import finished", result.as_dict())
+
+
 class PostDetailAPIView(GenericAPIView):
     """
     Retrieve, update, and delete posts by slug.
     """
     permission_classes = [IsAuthenticated]
+    token_user_for_safe_methods = True
 
-    def get_object(self, slug):
-        return Post.objects.filter(slug=slug).first()
+    def get_object(self, slug, defer_fields=True):
+        # Instances that get saved must not have deferred fields
+        return shape_queryset(Post.objects.filter(slug=slug), PostSerializer, defer_fields,
+                              extra_fields=['updated_at']).first()
 
     @swagger_auto_schema(
-        operation_description="Retrieve a specific post by slug",
-        responses={200: openapi.Response("Post fetched successfully", PostSerializer)},
+        operation_description="Retrieve a specific post by slug. Supports conditional requests with If-None-Match / If-Modified-Since.",
+        responses={
+            200: openapi.Response("Post fetched successfully", PostSerializer),
+            304: openapi.Response("Post not modified since the given ETag or date"),
+        },
     )
     def get(self, request, slug):
-        post = self.get_object(slug)
-        if post:
-            serializer = PostSerializer(post)
-            return get_response(status.HTTP_200_OK, "Post fetched successfully", serializer.data)
-        return get_response(status.HTTP_404_NOT_FOUND, "Post not found", {})
+        # Served from the cache when possible, the database is only hit on a miss
+        entry = get_post_detail(slug)
+        if entry is None:
+            # A lagging replica must not put an outdated post back in the cache
+            with use_primary():
+                post = self.get_object(slug)
+            if not post:
+                return get_response(status.HTTP_404_NOT_FOUND, "Post not found", {})
+            entry = cache_post_detail(post, PostSerializer(post).data)
+
+        response = get_response(status.HTTP_200_OK, "Post fetched successfully", entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        # Checked by ETag only: the payload embeds the author, whose changes don't move the post's updated_at
+        return get_conditional_response(request, etag=entry['etag'], response=response)
 
     @swagger_auto_schema(
         operation_description="Update a post",
@@ -88,7 +195,7 @@ class PostDetailAPIView(GenericAPIView):
         },
     )
     def put(self, request, slug):
-        post = self.get_object(slug)
+        post = self.get_object(slug, defer_fields=False)
         if not post:
             return get_response(status.HTTP_404_NOT_FOUND, "Post not found", {})
 
@@ -104,7 +211,7 @@ class PostDetailAPIView(GenericAPIView):
         return get_response(status.HTTP_400_BAD_REQUEST, "Invalid data", serializer.errors)
 
     def delete(self, request, slug):
-        post = self.get_object(slug)
+        post = self.get_object(slug, defer_fields=False)
         if not post:
             return get_response(status.HTTP_404_NOT_FOUND, "Post not found", {})
 
@@ -116,11 +223,12 @@ class PostDetailAPIView(GenericAPIView):
         return get_response(status.HTTP_200_OK, "Post deleted successfully", {})
 
 
-class CommentListCreateAPIView(GenericAPIView):
+class CommentListCreateAPIView(CursorPaginationMixin, GenericAPIView):
     """
     API view to list and create comments for a specific post identified by its slug.
     """
     permission_classes = [IsAuthenticated]
+    token_user_for_safe_methods = True
     pagination_class = PageNumberPagination  # Enable pagination
 
     def get_post_object(self, slug):
@@ -130,9 +238,13 @@ class CommentListCreateAPIView(GenericAPIView):
         return Post.objects.filter(slug=slug).first()
 
     @swagger_auto_schema(
-        operation_description="Get the list of comments for a post with pagination ordered by timestamp",
+        operation_description="Get the list of comments for a post with pagination ordered by timestamp. Pass "
+                              "`pagination=cursor` to get keyset pagination with opaque next/previous cursors "
+                              "instead of page numbers, which costs the same on any page.",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to `cursor` for cursor pagination", type=openapi.TYPE_STRING, enum=['cursor']),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from the `next`/`previous` link", type=openapi.TYPE_STRING),
         ],
         responses={
             200: openapi.Response("Paginated list of comments", CommentSerializer(many=True)),
@@ -145,21 +257,22 @@ class CommentListCreateAPIView(GenericAPIView):
         """
         Handle GET requests to fetch a paginated list of comments for a post.
         """
-        post_object = self.get_post_object(slug)
-        if not post_object:
+        # The post is looked up by the same query as the comments; only an empty page needs to know if it exists
+        comment_queryset = comment_fast_serializer.values(Comment.of_post(slug))
+        try:
+            paginated_comments = self.paginate_queryset(comment_queryset)
+        except NotFound:
+            # Out of range page or invalid cursor, unless there is no such post
+            if not Post.objects.filter(slug=slug).exists():
+                return get_response(status.HTTP_400_BAD_REQUEST, "Invalid slug data", [])
+            raise
+        if not paginated_comments and not Post.objects.filter(slug=slug).exists():
             return get_response(status.HTTP_400_BAD_REQUEST, "Invalid slug data", [])
 
-        comment_queryset = post_object.comments.select_related("post", "author").all().order_by("-timestamp")
-
-        # Paginate the queryset
-        paginator = self.pagination_class()
-        paginated_comments = paginator.paginate_queryset(comment_queryset, request)
-        serializer = CommentSerializer(paginated_comments, many=True)
-
-        return paginator.get_paginated_response({
+        return self.get_paginated_response({
             "status": status.HTTP_200_OK,
             "msg": "Retrieved comments successfully",
-            "data": serializer.data
+            "data": comment_fast_serializer.serialize(paginated_comments)
         })
 
     @swagger_auto_schema(
@@ -184,7 +297,9 @@ class CommentListCreateAPIView(GenericAPIView):
 
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(author=request.user, post=post_object)
+            # The comment and the post's comment_count are written together
+            with transaction.atomic():
+                serializer.save(author=request.user, post=post_object)
             return get_response(status.HTTP_201_CREATED, "Comment created successfully", serializer.data)
 
         return get_response(status.HTTP_400_BAD_REQUEST, "Invalid Request Body", serializer.errors)
@@ -192,22 +307,79 @@ class CommentListCreateAPIView(GenericAPIView):
 
 class TopCommentedPostsAPIView(GenericAPIView):
     """
-    API to get the top five most commented posts.
+    API to get the most commented posts, of all time or of the last hour, day or week.
     """
     permission_classes = [IsAuthenticated]  # Anyone can access this API
+    token_user_for_safe_methods = True
+    default_limit = 5
+    max_limit = 100
 
     @swagger_auto_schema(
-        operation_description="Retrieve the top five most commented posts",
+        operation_description="Retrieve the most commented posts (top five by default)",
+        manual_parameters=[
+            openapi.Parameter('window', openapi.IN_QUERY, description="Count comments of all time (default) or of the last hour, day or week",
+                              type=openapi.TYPE_STRING, enum=['all'] + list(WINDOWS)),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Number of posts, up to 100", type=openapi.TYPE_INTEGER),
+        ],
         responses={
             200: openapi.Response(description="Posts fetching Successfully", examples={
                 "application/json": {"status": 200, "msg": "Posts fetching Successfully", "data": []}
+            }),
+            400: openapi.Response(description="Invalid window or limit", examples={
+                "application/json": {"status": 400, "msg": "Invalid window or limit", "data": {}}
             })},
     )
     def get(self, request):
-        # Annotate posts with the count of their comments and order them by count (descending)
-        top_commented_posts = Post.objects.annotate(comment_count=Count('comments')).order_by('-comment_count', '-timestamp')
-        if top_commented_posts.count() > 5:
-            top_commented_posts = top_commented_posts[:5]
-        
-        serializer = TopCommentPostSerializer(top_commented_posts, many=True)
-        return get_response(status.HTTP_200_OK, "Top commented posts retrieved successfully", serializer.data)
\ No newline at end of file
+        window = request.query_params.get("window", "all")
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = 0
+        if (window != "all" and window not in WINDOWS) or not 0 < limit <= self.max_limit:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Invalid window or limit", {})
+
+        fast_serializer = top_comment_post_fast_serializer
+        if window == "all":
+            # comment_count is denormalized on Post, so this is a short scan of its (comment_count, timestamp) index
+            top_commented_posts = fast_serializer.values(Post.objects.order_by('-comment_count', '-timestamp')[:limit])
+        else:
+            # Counts come from the in-memory leaderboard, only the posts themselves are fetched
+            ranked = leaderboard.top(window, limit)
+            rows = fast_serializer.values(Post.objects.filter(id__in=[post_id for post_id, _ in ranked]))
+            posts = {row.id: row for row in rows}
+            top_commented_posts = [posts[post_id]._replace(comment_count=comment_count)
+                                   for post_id, comment_count in ranked if post_id in posts]
+
+        data = fast_serializer.serialize(top_commented_posts)
+        return get_response(status.HTTP_200_OK, "Top commented posts retrieved successfully", data)
+
+
+class ExportAPIView(GenericAPIView):
+    """
+    Stream every post (kind="posts") or comment (kind="comments") as NDJSON, in id order.
+    """
+    permission_classes = [IsAuthenticated]
+    token_user_for_safe_methods = True
+    kind = 'posts'
+
+    @swagger_auto_schema(
+        operation_description="Stream all rows as NDJSON (`application/x-ndjson`), one JSON object per line, "
+                              "ordered by id. Resume an interrupted export with `min_id` = last id + 1.",
+        manual_parameters=[
+            openapi.Parameter('updated_since', openapi.IN_QUERY, description="Only rows changed at or after this ISO 8601 date and time", type=openapi.TYPE_STRING),
+            openapi.Parameter('min_id', openapi.IN_QUERY, description="Smallest id to export", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('max_id', openapi.IN_QUERY, description="Largest id to export", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response("NDJSON stream"),
+            400: openapi.Response(description="Invalid filter", examples={
+                "application/json": {"status": 400, "msg": "Invalid filter", "data": {}}
+            }),
+        },
+    )
+    def get(self, request):
+        try:
+            filters = parse_filters(request.query_params)
+        except ValueError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Invalid filter", {"detail": str(e)})
+        return StreamingHttpResponse(export_ndjson(self.kind, **filters), content_type='application/x-ndjson')
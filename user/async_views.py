@@ -0,0 +1,75 @@
+"""
+Async versions of the register and login endpoints, served under /async/ with
+the same responses as user/views.py.
+
+Both spend most of their time on PBKDF2 in the hashing pool (user/hashing.py).
+The DRF views hold a thread while they wait for it; these await the pool's
+future instead, so the event loop serves other requests meanwhile. The
+queries around the hashing (validation, the user row, the outstanding token)
+are short and run through `sync_to_async` or the async ORM.
+"""
+import io
+
+from asgiref.sync import sync_to_async
+from django.views import View
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from blogging.renderers import ORJSONParser
+from post.async_views import get_response, render
+from user.blacklist import FilteredRefreshToken
+from user.hashing import HashingUnavailable, aauthenticate, hashing_unavailable_response
+from user.serializers import LoginCredentialsSerializer, LoginUserSerializer, RegisterUserSerializer
+
+
+class AsyncAnonymousAPIView(View):
+    """
+    Request parsing and error responses of the DRF views, for async handlers
+    open to anonymous users.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except HashingUnavailable as exc:
+            return hashing_unavailable_response(exc)
+        except APIException as exc:
+            return render({'detail': exc.detail}, exc.status_code)
+
+    @staticmethod
+    def parse(request):
+        # Malformed JSON raises ParseError, answered with a 400 by dispatch()
+        return ORJSONParser().parse(io.BytesIO(request.body)) if request.body else {}
+
+
+class AsyncRegisterUserView(AsyncAnonymousAPIView):
+
+    async def post(self, request):
+        serializer = RegisterUserSerializer(data=self.parse(request))
+        # The unique email check queries the database
+        if await sync_to_async(serializer.is_valid)():
+            await serializer.asave()
+            return get_response(status.HTTP_201_CREATED, "User registered successfully!", {})
+
+        return get_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
+
+
+class AsyncLoginAPIView(AsyncAnonymousAPIView):
+
+    async def post(self, request):
+        serializer = LoginCredentialsSerializer(data=self.parse(request))
+        if not serializer.is_valid():
+            return get_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
+
+        user = await aauthenticate(serializer.validated_data['email'], serializer.validated_data['password'])
+        if user is None:
+            errors = serializers.as_serializer_error(serializers.ValidationError(LoginUserSerializer.invalid_credentials))
+            return get_response(status.HTTP_400_BAD_REQUEST, errors, {})
+
+        # Records the outstanding token
+        refresh = await sync_to_async(FilteredRefreshToken.for_user)(user)
+        data = {
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        }
+        return get_response(status.HTTP_200_OK, "Login successful !", data)
@@ -0,0 +1,121 @@
+"""
+JWT authentication without a user query on every request.
+
+`CachedJWTAuthentication` keeps recently authenticated users in a bounded
+in-process LRU with a TTL. Saving or deleting a user (password change,
+deactivation, ...) drops its entry through the signals in user/signals.py;
+other worker processes keep their copy until it expires, so changes made
+elsewhere, or through `QuerySet.update()`, take up to `JWT_USER_CACHE_TTL`
+seconds to apply.
+
+Views that only read public data can set `token_user_for_safe_methods = True`:
+GET/HEAD/OPTIONS requests then get a `TokenUser` built from the token claims
+alone, with no query and no cache lookup. Such a user is trusted until the
+token expires, even if the account is deactivated in the meantime.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Thread-safe LRU of user id -> user, whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # user id -> (expires at, user)
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'JWT_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        view = request.parser_context.get('view') if request.parser_context else None
+        if request.method in SAFE_METHODS and getattr(view, 'token_user_for_safe_methods', False):
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header is not None else None
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+            return api_settings.TOKEN_USER_CLASS(validated_token), validated_token
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            # Loads the user and checks it is active and the password unchanged
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        elif api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        # Inactive users are never cached. Each request gets its own copy so
+        # nothing set on request.user leaks into other requests.
+        return copy.copy(user)
+
+    async def aauthenticate(self, request, token_user=False):
+        """
+        Async counterpart of `authenticate()` for plain Django async views.
+        Returns the user or None, raises like `authenticate()`.
+        """
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if token_user:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+        # A cache miss queries the database, so this runs in a worker thread
+        return await sync_to_async(self.get_user)(validated_token)
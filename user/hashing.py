@@ -0,0 +1,234 @@
+"""
+Password hashing in a bounded process pool.
+
+PBKDF2 is deliberately slow. Login and registration run it here instead of on
+the request worker, so a burst of logins uses the pool's CPUs and not the ones
+serving the read API. At most `HASHING_WORKERS` hashes run at once and
+`HASHING_QUEUE_SIZE` more may wait. A request that can't get a slot within
+`HASHING_QUEUE_TIMEOUT` seconds gets `HashingUnavailable` (503) instead of
+queueing without bound.
+
+Workers are spawned, not forked, so they never share the parent's database
+connections, and only get a password and a hash. Database access stays in the
+calling process.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from blogging.renderers import ORJSONRenderer
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins in progress, please retry shortly."
+    default_code = 'hashing_unavailable'
+
+
+def hashing_unavailable_response(exc):
+    """
+    The 503 of the login and register views: the pool is saturated, shed the
+    request rather than queue it. A plain Django response rendered like the
+    DRF views render, so the sync and the async views both return it.
+    """
+    payload = {'status': status.HTTP_503_SERVICE_UNAVAILABLE, 'msg': str(exc.detail), 'data': {}}
+    response = HttpResponse(ORJSONRenderer().render(payload), status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content_type='application/json')
+    response['Retry-After'] = '1'
+    return response
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def _timed(function, *args):
+    # Runs in a worker: report when the job started to measure the queue wait
+    return time.time(), function(*args)
+
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+def _check_password(password, encoded):
+    """
+    (matches, hash to store instead or None). Without `encoded` (unknown user)
+    the default hasher still runs, so response times don't reveal which emails exist.
+    """
+    if encoded is None:
+        hashers.make_password(password)
+        return False, None
+    if not hashers.check_password(password, encoded):
+        return False, None
+    # Same upgrade rule as check_password() with a setter
+    preferred = hashers.get_hasher('default')
+    must_update = hashers.identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded)
+    return True, hashers.make_password(password) if must_update else None
+
+
+class HashingPool:
+
+    def __init__(self, workers, queue_size, queue_timeout):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def get_executor(self):
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                    )
+        return self.executor
+
+    def _reserve(self, acquired):
+        if not acquired:
+            with self.stats_lock:
+                self.rejected += 1
+            raise HashingUnavailable()
+        with self.stats_lock:
+            self.in_flight += 1
+
+    def discard_executor(self, executor):
+        """
+        Drop a broken executor (a worker was killed, e.g. by the OOM killer), the next job starts a new one.
+        """
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, executor, function, *args):
+        submitted = time.time()
+        try:
+            future = executor.submit(_timed, function, *args)
+        except BaseException:
+            self._release(submitted, None)
+            raise
+        future.add_done_callback(lambda done: self._release(submitted, done))
+        return future
+
+    def _release(self, submitted, future):
+        self.slots.release()
+        with self.stats_lock:
+            self.in_flight -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                started = future.result()[0]
+                wait = max(0.0, started - submitted)
+                self.completed += 1
+                self.wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+                self.run_seconds += max(0.0, time.time() - started)
+
+    def run(self, function, *args):
+        # A job lost with a broken pool is retried once on a new one, then the request gets a 503
+        for _ in range(2):
+            self._reserve(self.slots.acquire(timeout=self.queue_timeout))
+            executor = self.get_executor()
+            try:
+                return self._submit(executor, function, *args).result()[1]
+            except BrokenProcessPool:
+                self.discard_executor(executor)
+        raise HashingUnavailable()
+
+    async def run_async(self, function, *args):
+        for _ in range(2):
+            # Waiting for a slot must not block the event loop, so only that wait goes to a thread
+            acquired = self.slots.acquire(blocking=False) or await asyncio.to_thread(
+                self.slots.acquire, timeout=self.queue_timeout
+            )
+            self._reserve(acquired)
+            executor = self.get_executor()
+            try:
+                return (await asyncio.wrap_future(self._submit(executor, function, *args)))[1]
+            except BrokenProcessPool:
+                self.discard_executor(executor)
+        raise HashingUnavailable()
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'wait_seconds_total': round(self.wait_seconds, 6),
+                'wait_seconds_max': round(self.max_wait_seconds, 6),
+                'wait_seconds_avg': round(self.wait_seconds / self.completed, 6) if self.completed else 0.0,
+                'run_seconds_total': round(self.run_seconds, 6),
+            }
+
+
+hashing_pool = HashingPool(
+    workers=getattr(settings, 'HASHING_WORKERS', max(1, (os.cpu_count() or 2) // 2)),
+    queue_size=getattr(settings, 'HASHING_QUEUE_SIZE', 32),
+    queue_timeout=getattr(settings, 'HASHING_QUEUE_TIMEOUT', 0.5),
+)
+
+
+def make_password(password):
+    return hashing_pool.run(_make_password, password)
+
+
+async def amake_password(password):
+    return await hashing_pool.run_async(_make_password, password)
+
+
+def _authenticate_user(email):
+    from user.models import User
+
+    user = User.objects.filter(email=email).first()
+    return user, (user.password if user is not None and user.has_usable_password() else None)
+
+
+def _finish_authentication(user, matches, new_hash):
+    # Same rules as ModelBackend: inactive users can't log in, outdated hashes are upgraded
+    if not matches or user is None or not user.is_active:
+        return None
+    if new_hash:
+        user.password = new_hash
+        user.save(update_fields=['password'])
+    return user
+
+
+def authenticate(email, password):
+    """
+    The active user with this email and password, or None. Like
+    `django.contrib.auth.authenticate` with the ModelBackend, minus the hashing on this process.
+    """
+    user, encoded = _authenticate_user(email)
+    matches, new_hash = hashing_pool.run(_check_password, password, encoded)
+    return _finish_authentication(user, matches, new_hash)
+
+
+async def aauthenticate(email, password):
+    user, encoded = await sync_to_async(_authenticate_user)(email)
+    matches, new_hash = await hashing_pool.run_async(_check_password, password, encoded)
+    return await sync_to_async(_finish_authentication)(user, matches, new_hash)
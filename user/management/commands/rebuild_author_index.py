@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from user.models import User, UserSearchTrigram
+from user.search import SEARCH_FIELDS, user_trigrams
+
+
+class Command(BaseCommand):
+    help = "Rebuild the trigram index used by the author filter of the post list, in batches of users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Users per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        last_id, users, rows = 0, 0, 0
+
+        while True:
+            batch = list(User.objects.filter(id__gt=last_id).order_by('id')
+                         .values('id', *SEARCH_FIELDS)[:batch_size])
+            if not batch:
+                break
+            ids = [user['id'] for user in batch]
+            trigrams = [UserSearchTrigram(user_id=user['id'], trigram=gram)
+                        for user in batch for gram in user_trigrams(user)]
+            with transaction.atomic():
+                UserSearchTrigram.objects.filter(user_id__in=ids).delete()
+                UserSearchTrigram.objects.bulk_create(trigrams, batch_size=10000)
+            last_id = ids[-1]
+            users += len(batch)
+            rows += len(trigrams)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {users} users ({rows} trigrams) in {time.monotonic() - started:.1f}s"
+        ))
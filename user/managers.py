@@ -1,4 +1,9 @@
+from django.apps import apps
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
+from django.db.models import Q
+
+from user.search import term_trigrams, user_trigrams
 
 
 class CustomUserManager(BaseUserManager):
@@ -32,3 +37,60 @@ class CustomUserManager(BaseUserManager):
             raise ValueError("Superuser must have is_superuser=True.")
 
         return self.create_user(email, password, **extra_fields)
+
+    def search(self, term):
+        """
+        Users whose first name, last name or email contains `term` (case-insensitive).
+
+        Candidates are narrowed through the trigram index first, the `icontains`
+        check then only runs on those rows to drop false positives. Terms shorter
+        than three characters match too many users for an index to help.
+        """
+        queryset = self.filter(
+            Q(first_name__icontains=term) |
+            Q(last_name__icontains=term) |
+            Q(email__icontains=term)
+        )
+        trigram_model = apps.get_model('user', 'UserSearchTrigram')
+        candidates = trigram_model.objects.candidates(term)
+        if candidates is None:
+            return queryset
+        return queryset.filter(id__in=candidates)
+
+
+class UserSearchTrigramManager(models.Manager):
+    """
+    Maintains and queries the trigram rows of the author search index.
+    """
+
+    def candidates(self, term):
+        """
+        Return a `user_id` queryset of users that may contain `term`, or None
+        when the term is too short to have trigrams.
+
+        Non-overlapping trigrams already cover the whole term, so only those are
+        intersected (each one an index range on (trigram, user)) which keeps the
+        query small for long terms.
+        """
+        grams = term_trigrams(term)
+        if not grams:
+            return None
+
+        queryset = self.filter(trigram=grams[0]).values('user')
+        for gram in grams[1:]:
+            queryset = queryset.filter(user__in=self.filter(trigram=gram).values('user'))
+        return queryset
+
+    def reindex(self, user):
+        """
+        Bring the trigram rows of a single user in line with its current fields.
+        """
+        wanted = user_trigrams(user)
+        existing = set(self.filter(user=user).values_list('trigram', flat=True))
+        if existing - wanted:
+            self.filter(user=user, trigram__in=existing - wanted).delete()
+        if wanted - existing:
+            self.bulk_create(
+                [self.model(user=user, trigram=gram) for gram in wanted - existing],
+                ignore_conflicts=True,
+            )
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from user.search import SEARCH_FIELDS, user_trigrams
+
+
+def backfill_search_trigrams(apps, schema_editor):
+    User = apps.get_model('user', 'User')
+    UserSearchTrigram = apps.get_model('user', 'UserSearchTrigram')
+    db_alias = schema_editor.connection.alias
+    rows = []
+    for user in User.objects.using(db_alias).values('id', *SEARCH_FIELDS).iterator(chunk_size=2000):
+        rows.extend(UserSearchTrigram(user_id=user['id'], trigram=gram) for gram in user_trigrams(user))
+        if len(rows) >= 10000:
+            UserSearchTrigram.objects.using(db_alias).bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    UserSearchTrigram.objects.using(db_alias).bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_alter_user_managers_user_dob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'user'), name='user_search_trigram_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_search_trigrams, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
-from user.managers import CustomUserManager
+from user.managers import CustomUserManager, UserSearchTrigramManager
+from user.search import SEARCH_FIELDS
 
 
 # Create your models here.
@@ -16,5 +17,32 @@ class User(AbstractUser):
 
     objects = CustomUserManager()
 
+    def save(self, *args, **kwargs):
+        # Keep the author search index in sync with name and email changes
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic(using=kwargs.get('using')):
+            super(User, self).save(*args, **kwargs)
+            if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+                UserSearchTrigram.objects.reindex(self)
+
     def __str__(self):
       return "{}".format(self.email)
+
+
+class UserSearchTrigram(models.Model):
+    """
+    One row per distinct trigram of a user's first name, last name and email.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_trigrams')
+    trigram = models.CharField(max_length=3)
+
+    objects = UserSearchTrigramManager()
+
+    class Meta:
+        constraints = [
+            # Also serves as the (trigram, user) lookup index
+            models.UniqueConstraint(fields=['trigram', 'user'], name='user_search_trigram_unique'),
+        ]
+
+    def __str__(self):
+        return "{} ({})".format(self.trigram, self.user_id)
@@ -0,0 +1,47 @@
+"""
+Trigram helpers for the author search index.
+
+Every user gets one `UserSearchTrigram` row per distinct trigram of their
+lower-cased first name, last name and email. A substring search then only has
+to look at users owning all trigrams of the search term, which an ordinary
+B-tree index on (trigram, user) answers without scanning the user table.
+"""
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+
+def normalize(value):
+    return (value or '').lower()
+
+
+def value_trigrams(value):
+    """
+    All trigrams of a single field value, e.g. "anna" -> {"ann", "nna"}.
+    """
+    value = normalize(value)
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def user_trigrams(user):
+    """
+    Trigrams for every searchable field of a user (a model instance or a dict).
+    """
+    grams = set()
+    for field in SEARCH_FIELDS:
+        value = user[field] if isinstance(user, dict) else getattr(user, field)
+        grams |= value_trigrams(value)
+    return grams
+
+
+def term_trigrams(term):
+    """
+    Trigrams a user must own to possibly match `term`: the non-overlapping ones
+    plus the last one, e.g. "johnson" -> ["joh", "nso", "son"]. Terms shorter
+    than three characters have none and cannot use the index.
+    """
+    term = normalize(term)
+    if len(term) < 3:
+        return []
+    grams = [term[i:i + 3] for i in range(0, len(term) - 2, 3)]
+    if grams[-1] != term[-3:]:
+        grams.append(term[-3:])
+    return grams
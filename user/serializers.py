@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from user.blacklist import FilteredRefreshToken
+from user.hashing import amake_password, authenticate, make_password
 from user.models import User
 
 
@@ -12,17 +14,25 @@ class RegisterUserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        # Create the user with the provided data
+        # Create the user with the provided data, the password is hashed in the hashing pool
         user = User.objects.create(
-            email=validated_data['email'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            dob=validated_data['dob']
+            **self.profile(validated_data),
+            password=make_password(validated_data['password']),
         )
-        user.set_password(validated_data['password'])
-        user.save()
         return user
 
+    async def asave(self):
+        # save() for the async register view: the event loop serves other requests during the hashing
+        self.instance = await User.objects.acreate(
+            **self.profile(self.validated_data),
+            password=await amake_password(self.validated_data['password']),
+        )
+        return self.instance
+
+    @staticmethod
+    def profile(validated_data):
+        return {field: validated_data[field] for field in ('email', 'first_name', 'last_name', 'dob')}
+
 
 class LoginUserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(write_only=True)
@@ -32,14 +42,31 @@ class LoginUserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['email', 'password']
 
+    invalid_credentials = "Invalid email or password"
+
     def validate(self, data):
         email = data.get('email')
         password = data.get('password')
 
-        # Authenticate the user
+        # Authenticate the user, the password is checked in the hashing pool
         user = authenticate(email=email, password=password)
         if user is None:
-            raise serializers.ValidationError("Invalid email or password")
+            raise serializers.ValidationError(self.invalid_credentials)
         
         data['user'] = user
         return data
+
+
+class LoginCredentialsSerializer(LoginUserSerializer):
+    """
+    The field checks of LoginUserSerializer only: the async login view checks
+    the password itself, with `aauthenticate`.
+    """
+
+    def validate(self, data):
+        return data
+
+
+class RefreshTokenSerializer(TokenRefreshSerializer):
+    # Checks the blacklist filter before the BlacklistedToken table
+    token_class = FilteredRefreshToken
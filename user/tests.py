@@ -1,5 +1,18 @@
 import unittest
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from user.authentication import CachedJWTAuthentication, user_cache
+from user.blacklist import BloomFilter, blacklist_filter
+from user.hashing import aauthenticate, hashing_pool
+import asyncio
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+import io
 from rest_framework import status
 from django.contrib.auth import get_user_model
 import json
@@ -47,3 +60,227 @@ class LoginTestCase(unittest.TestCase):
     def tearDown(self):
         # Clean up after tests
         User.objects.all().delete()
+
+
+class AuthorSearchIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.naresh = User.objects.create_user(email='naresh.sutha@gmail.com', first_name='Naresh', last_name='Sutha')
+        self.jane = User.objects.create_user(email='jane@example.com', first_name='Jane', last_name='Johnson')
+
+    def search(self, term):
+        return set(User.objects.search(term).values_list('email', flat=True))
+
+    def test_search_by_name_and_email(self):
+        self.assertEqual(self.search('RESH'), {'naresh.sutha@gmail.com'})
+        self.assertEqual(self.search('johnson'), {'jane@example.com'})
+        self.assertEqual(self.search('example.com'), {'jane@example.com'})
+        self.assertEqual(self.search('xyz'), set())
+        # Trigrams are present but not contiguous in any field
+        self.assertEqual(self.search('sutjane'), set())
+
+    def test_short_terms_fall_back_to_icontains(self):
+        self.assertEqual(self.search('J'), {'jane@example.com'})
+        self.assertEqual(self.search('sh'), {'naresh.sutha@gmail.com'})
+
+    def test_index_follows_user_changes(self):
+        self.jane.last_name = 'Doe'
+        self.jane.save()
+        self.assertEqual(self.search('johnson'), set())
+        self.assertEqual(self.search('doe'), {'jane@example.com'})
+
+        # Saves that don't touch searchable fields leave the index alone
+        self.jane.save(update_fields=['last_login'])
+        self.assertEqual(self.search('doe'), {'jane@example.com'})
+
+    def tearDown(self):
+        # Clean up after tests
+        User.objects.all().delete()
+
+
+class CachedJWTAuthenticationTestCase(unittest.TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email='cached@gmail.com')
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = CachedJWTAuthentication()
+
+    def test_user_is_loaded_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.authentication.get_user(self.token)
+            second = self.authentication.get_user(self.token)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(first, self.user)
+        # Requests get their own copy of the cached user
+        self.assertIsNot(first, second)
+
+    def test_deactivation_invalidates_the_cache(self):
+        self.authentication.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_cache_is_bounded_and_expires(self):
+        user_cache.set('a', self.user)
+        user_cache.set('b', self.user)
+        user_cache.get('a')
+        original = (user_cache.max_size, user_cache.ttl)
+        try:
+            user_cache.max_size = 2
+            user_cache.set('c', self.user)
+            # 'b' was the least recently used entry
+            self.assertIsNone(user_cache.get('b'))
+            self.assertIsNotNone(user_cache.get('a'))
+            user_cache.ttl = -1
+            user_cache.set('d', self.user)
+            self.assertIsNone(user_cache.get('d'))
+        finally:
+            user_cache.max_size, user_cache.ttl = original
+
+    def tearDown(self):
+        user_cache.clear()
+        User.objects.all().delete()
+
+
+class TokenBlacklistTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='blacklist@gmail.com')
+        self.user.set_password('testpassword')
+        self.user.save()
+        response = self.client.post('/login/', {'email': 'blacklist@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.tokens = json.loads(response.content)["data"]
+        blacklist_filter.rebuild()
+
+    def refresh(self):
+        return self.client.post('/refresh-token/', {'refresh': self.tokens['refresh']}, content_type='application/json')
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_refresh_skips_the_blacklist_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if 'token_blacklist' in query['sql']])
+
+    def test_logged_out_token_cannot_refresh(self):
+        response = self.client.post('/logout/', {'refresh': self.tokens['refresh']}, content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh().status_code, status.HTTP_400_BAD_REQUEST)
+        # Also once the filter is rebuilt from the database
+        blacklist_filter.rebuild()
+        self.assertEqual(self.refresh().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_tokens_deletes_expired_tokens_only(self):
+        OutstandingToken.objects.create(user=self.user, jti='expired', token='-',
+                                        expires_at=timezone.now() - timedelta(days=1))
+        out = io.StringIO()
+        call_command('prune_tokens', batch_size=1, stdout=out)
+        self.assertIn('Deleted 1 expired', out.getvalue())
+        self.assertFalse(OutstandingToken.objects.filter(jti='expired').exists())
+        self.assertEqual(self.refresh().status_code, status.HTTP_200_OK)
+
+    def tearDown(self):
+        OutstandingToken.objects.all().delete()
+        User.objects.all().delete()
+
+
+class HashingPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email='hashing@gmail.com', is_staff=True)
+        self.user.set_password('testpassword')
+        self.user.save()
+
+    def login(self):
+        return self.client.post('/login/', {'email': 'hashing@gmail.com', 'password': 'testpassword'},
+                                content_type='application/json')
+
+    def test_login_and_register_hash_in_the_pool(self):
+        completed = hashing_pool.stats()['completed']
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        response = self.client.post('/register/', {'email': 'new@gmail.com', 'first_name': 'New', 'last_name': 'User',
+                                                   'dob': '1990-01-01', 'password': 'newpassword'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(User.objects.get(email='new@gmail.com').check_password('newpassword'))
+        self.assertEqual(hashing_pool.stats()['completed'], completed + 2)
+
+    def test_async_authenticate(self):
+        self.assertEqual(asyncio.run(aauthenticate('hashing@gmail.com', 'testpassword')), self.user)
+        self.assertIsNone(asyncio.run(aauthenticate('hashing@gmail.com', 'wrongpassword')))
+        self.assertIsNone(asyncio.run(aauthenticate('nobody@gmail.com', 'testpassword')))
+
+    def test_async_login_and_register_match_sync_views(self):
+        for credentials in [{'email': 'hashing@gmail.com', 'password': 'wrongpassword'},
+                            {'email': 'not-an-email', 'password': 'testpassword'}]:
+            expected = self.client.post('/login/', credentials, content_type='application/json')
+            response = self.client.post('/async/login/', credentials, content_type='application/json')
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+
+        response = self.client.post('/async/login/', {'email': 'hashing@gmail.com', 'password': 'testpassword'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = json.loads(response.content)["data"]["access"]
+        self.assertEqual(AccessToken(token)['user_id'], self.user.pk)
+
+        new_user = {'email': 'async@gmail.com', 'first_name': 'Async', 'last_name': 'User', 'dob': '1990-01-01',
+                    'password': 'newpassword'}
+        response = self.client.post('/async/register/', new_user, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(User.objects.get(email='async@gmail.com').check_password('newpassword'))
+        expected = self.client.post('/register/', new_user, content_type='application/json')
+        response = self.client.post('/async/register/', new_user, content_type='application/json')
+        self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+
+    def test_broken_pool_is_replaced(self):
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        executor = hashing_pool.executor
+        # A worker killed by the OOM killer breaks the whole executor
+        for process in list(executor._processes.values()):
+            process.kill()
+            process.join()
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(hashing_pool.executor)
+        self.assertIsNot(hashing_pool.executor, executor)
+
+    def test_saturated_pool_sheds_logins(self):
+        slots = hashing_pool.workers + hashing_pool.queue_size
+        timeout, hashing_pool.queue_timeout = hashing_pool.queue_timeout, 0.01
+        for _ in range(slots):
+            hashing_pool.slots.acquire()
+        try:
+            rejected = hashing_pool.stats()['rejected']
+            response = self.login()
+        finally:
+            for _ in range(slots):
+                hashing_pool.slots.release()
+            hashing_pool.queue_timeout = timeout
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(hashing_pool.stats()['rejected'], rejected + 1)
+
+    def test_diagnostics_for_staff_only(self):
+        token = json.loads(self.login().content)["data"]["access"]
+        response = self.client.get('/diagnostics/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)['data']
+        self.assertIn('wait_seconds_max', data['hashing'])
+        self.assertIn(data['database']['mode'], ('persistent', 'per_request', 'pool'))
+        self.assertGreaterEqual(data['database']['connections_opened'], 0)
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get('/diagnostics/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def tearDown(self):
+        User.objects.all().delete()
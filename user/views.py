@@ -1,13 +1,12 @@
 from rest_framework.generics import GenericAPIView
 from rest_framework import status
 from blogging.utils import get_response
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer
-from user.serializers import RegisterUserSerializer, LoginUserSerializer
+from user.blacklist import FilteredRefreshToken
+from user.hashing import HashingUnavailable, hashing_unavailable_response
+from user.serializers import RegisterUserSerializer, LoginUserSerializer, RefreshTokenSerializer
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from blogging.lazy import openapi, swagger_auto_schema
 
 
 class RegisterUserView(GenericAPIView):
@@ -40,14 +39,18 @@ class RegisterUserView(GenericAPIView):
                         'data': {}
                     }
                 }
-            )
+            ),
+            503: openapi.Response(description="Password hashing capacity exhausted, retry after the Retry-After delay"),
         }
     )
     def post(self, request):
         serializer = RegisterUserSerializer(data=request.data)
         if serializer.is_valid():
             # Save the user and return success response
-            serializer.save()
+            try:
+                serializer.save()
+            except HashingUnavailable as e:
+                return hashing_unavailable_response(e)
             return get_response(status.HTTP_201_CREATED, "User registered successfully!", {})
 
         return get_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
@@ -86,16 +89,21 @@ class LoginAPIView(GenericAPIView):
                         "data": {}
                     }
                 }
-            )
+            ),
+            503: openapi.Response(description="Password hashing capacity exhausted, retry after the Retry-After delay"),
         }
     )
     def post(self, request):
         serializer = LoginUserSerializer(data=request.data)
-        if serializer.is_valid():
+        try:
+            is_valid = serializer.is_valid()
+        except HashingUnavailable as e:
+            return hashing_unavailable_response(e)
+        if is_valid:
             user = serializer.validated_data['user']
 
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = FilteredRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
             
@@ -118,7 +126,7 @@ class CustomRefreshTokenView(GenericAPIView):
     """
     @swagger_auto_schema(
         operation_description="API to refresh access token using a valid refresh token",
-        request_body=TokenRefreshSerializer,
+        request_body=RefreshTokenSerializer,
         responses={
             200: openapi.Response(
                 description="Access token refreshed successfully",
@@ -146,7 +154,7 @@ class CustomRefreshTokenView(GenericAPIView):
     )
     def post(self, request):
         try:
-            serializer = TokenRefreshSerializer(data=request.data)
+            serializer = RefreshTokenSerializer(data=request.data)
             if serializer.is_valid(raise_exception=True):
                 # Get the new access token from the serializer
                 access_token = serializer.validated_data.get('access')
@@ -204,7 +212,7 @@ class LogoutApiView(GenericAPIView):
         if not refresh_token:
             return get_response(status.HTTP_400_BAD_REQUEST, "Refresh token is required", {})
         try:
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()  # Blacklist the token
             return get_response(status.HTTP_200_OK, "Logout successful", {})
 